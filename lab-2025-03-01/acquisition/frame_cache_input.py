@@ -0,0 +1,42 @@
+from typing import Optional
+import cv2
+
+from acquisition.base_video_input import BaseVideoInput
+from preprocessing.frame_cache import open_frame_cache
+
+
+class MemmapFrameInput(BaseVideoInput):
+    """
+    Replays a .frames cache written by `preprocess_video.py --output FRAMES`.
+
+    Frames are views into the memory-mapped file (no decode, no copy), returned one
+    after another as fast as they are consumed. Crop/resize is applied only when asked
+    for, the cache normally already holds preprocessed frames.
+    """
+
+    def __init__(self, path: str, crop_factor: Optional[float] = None, resize_maxwidth: Optional[int] = None) -> None:
+        super().__init__()
+        self._path = path
+        self.header, self.frames, self.frame_numbers = open_frame_cache(path)
+        self.video_fps = self.header.fps
+        self._next_frame = 0
+        self._should_preprocess = crop_factor not in (None, 1) or resize_maxwidth is not None
+        self._initialize_preprocess_frame(crop_factor, resize_maxwidth)
+
+    def capture(self) -> Optional[cv2.typing.MatLike]:
+        if self._next_frame >= len(self.frames):
+            self.is_finished = True
+            return None
+        frame = self.frames[self._next_frame]
+        if frame.shape[2] == 1:
+            frame = frame[:, :, 0]
+        self._next_frame += 1
+        return self.preprocess_frame(frame) if self._should_preprocess else frame
+
+    def timestamp(self) -> float:
+        """Source time in seconds of the last captured frame."""
+        return float(self.frame_numbers[max(0, self._next_frame - 1)]) / self.video_fps
+
+    def destroy(self):
+        self.frames = None
+        return super().destroy()
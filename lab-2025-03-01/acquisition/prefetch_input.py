@@ -0,0 +1,83 @@
+import threading
+from collections import deque
+from typing import Optional
+import cv2
+
+from acquisition.base_video_input import BaseVideoInput
+
+
+class PrefetchingVideoInput(BaseVideoInput):
+    """
+    Wraps any BaseVideoInput and captures (decodes and preprocesses) up to `depth`
+    frames ahead in a background thread.
+
+    Live sources drop the oldest buffered frame when the consumer falls behind, so
+    capture() always returns recent frames. Other sources (files, image folders) block
+    the background thread until there is room, so no frame is lost.
+
+    capture() returns None once the source is exhausted (also sets is_finished).
+    """
+
+    def __init__(self, source: BaseVideoInput, depth: int = 4, drop_oldest: Optional[bool] = None) -> None:
+        super().__init__()
+        self.source = source
+        self.depth = max(1, depth)
+        self.drop_oldest = source.is_live if drop_oldest is None else drop_oldest
+        self.is_live = source.is_live
+        self.dropped = 0
+        self._frames = deque(maxlen=self.depth)
+        self._condition = threading.Condition()
+        self._source_finished = False
+        self._stopping = False
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name='frame-prefetch')
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while not self.drop_oldest and len(self._frames) >= self.depth and not self._stopping:
+                        self._condition.wait()
+                    if self._stopping:
+                        return
+                frame = self.source.capture()
+                # Sources signal the end with None or False, or by setting is_finished
+                if frame is None or frame is False:
+                    return
+                with self._condition:
+                    if len(self._frames) == self.depth:
+                        self.dropped += 1  # deque(maxlen) drops the oldest
+                    self._frames.append(frame)
+                    self._condition.notify_all()
+                if self.source.is_finished:
+                    return
+        except BaseException as e:
+            self._error = e
+        finally:
+            with self._condition:
+                self._source_finished = True
+                self._condition.notify_all()
+
+    def capture(self) -> Optional[cv2.typing.MatLike]:
+        with self._condition:
+            while not self._frames and not self._source_finished:
+                self._condition.wait()
+            if self._frames:
+                frame = self._frames.popleft()
+                self._condition.notify_all()
+                return frame
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        self.is_finished = True
+        return None
+
+    def destroy(self):
+        with self._condition:
+            self._stopping = True
+            self._frames.clear()
+            self._condition.notify_all()
+        self._thread.join()
+        self.source.destroy()
+        return super().destroy()
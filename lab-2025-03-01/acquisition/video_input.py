@@ -4,11 +4,16 @@ from typing import Optional
 import cv2
 
 from acquisition.base_video_input import BaseVideoInput
+from acquisition.frame_cache_input import MemmapFrameInput
 from acquisition.image_series_input import SavedImageSeriesInput
+from acquisition.prefetch_input import PrefetchingVideoInput
+from preprocessing.frame_cache import FRAME_CACHE_EXTENSION
 from preprocessing.video_slicing import MP4VideoSlicer
 
 
 class PiCameraLiveInput(BaseVideoInput):
+    is_live = True
+
     def __init__(self, crop_factor: float, resize_hfov: int) -> None:
         from picamera2 import Picamera2
         picam2 = Picamera2()
@@ -69,6 +74,8 @@ class RecordedVideoInput(BaseVideoInput):
 
 
 class DefaultCameraVideoInput(BaseVideoInput):
+    is_live = True
+
     def __init__(self) -> None:
         super().__init__()
         camera = cv2.VideoCapture(0)
@@ -81,12 +88,22 @@ class DefaultCameraVideoInput(BaseVideoInput):
         return frame
 
 
-def get_video_input(source_path=None, crop=None, maxwidth=None) -> BaseVideoInput:
+def get_video_input(source_path=None, crop=None, maxwidth=None, prefetch: int = 0) -> BaseVideoInput:
+    """Pick the input for `source_path`; with prefetch > 0 frames are decoded that many ahead in a background thread."""
+    video_input = _create_video_input(source_path, crop, maxwidth)
+    if prefetch > 0:
+        return PrefetchingVideoInput(video_input, depth=prefetch)
+    return video_input
+
+
+def _create_video_input(source_path, crop, maxwidth) -> BaseVideoInput:
     try:
         return PiCameraLiveInput()
     except Exception:
         if source_path:
-            # Decide if provided path is folder or video file
+            # Decide if provided path is a frame cache, folder or video file
+            if source_path.endswith(FRAME_CACHE_EXTENSION):
+                return MemmapFrameInput(source_path, crop_factor=crop, resize_maxwidth=maxwidth)
             if os.path.isfile(source_path):
                 return RecordedVideoInput(source_path, crop_factor=crop, resize_maxwidth=maxwidth)
             else:
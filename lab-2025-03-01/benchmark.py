@@ -0,0 +1,160 @@
+import os
+import tempfile
+import time
+from typing import Optional
+import click
+import cv2
+import numpy as np
+
+from preprocessing.video_slicing import MP4VideoSlicer, load_keyframe_index
+from processing.frame_context import FrameContext
+from processing.flow_backends import DENSE_FLOW_BACKENDS, FARNEBACK_PRESETS
+from processing.optical_flow import DenseOpticalFlow
+
+
+def make_sample_video(path: str, width: int = 3840, height: int = 2160, fps: float = 30, seconds: float = 10) -> str:
+    """Write a synthetic moving-texture MP4 to benchmark decoding on."""
+    rng = np.random.default_rng(0)
+    texture = cv2.resize(rng.integers(0, 255, (height // 8, width // 8, 3), dtype=np.uint8), (width, height))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*'mp4v'), fps, (width, height))
+    for i in range(int(fps * seconds)):
+        writer.write(np.roll(texture, i * 11, axis=1))
+    writer.release()
+    return path
+
+
+def read_gray_frames(video: str, count: int, maxwidth: int) -> list:
+    """First `count` frames of a video as grayscale images no wider than maxwidth."""
+    capture = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < count:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray.shape[1] > maxwidth:
+            height = round(gray.shape[0] * maxwidth / gray.shape[1])
+            gray = cv2.resize(gray, (maxwidth, height), interpolation=cv2.INTER_AREA)
+        frames.append(gray)
+    capture.release()
+    return frames
+
+
+def run_dense_flow(processor: DenseOpticalFlow, frames: list) -> tuple[list, float]:
+    """Flow fields of consecutive frame pairs and the frames/s the processor ran at."""
+    processor.set1stFrame(FrameContext(frames[0]))
+    flows = []
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        flows.append(processor.apply(FrameContext(frame))[1])
+    return flows, len(flows) / (time.perf_counter() - start)
+
+
+def endpoint_error(flows: list, reference: list) -> float:
+    """Mean endpoint error in pixels between two sequences of full-resolution flow fields."""
+    return float(np.mean([np.linalg.norm(flow - ref, axis=2).mean() for flow, ref in zip(flows, reference)]))
+
+
+def _sample_or(video: Optional[str]) -> str:
+    if video is not None:
+        return video
+    path = os.path.join(tempfile.gettempdir(), 'benchmark_sample_4k.mp4')
+    if not os.path.exists(path):
+        click.echo(f'Writing 4K sample to {path}...')
+        make_sample_video(path)
+    return path
+
+
+@click.group()
+def cli():
+    """Micro-benchmarks for the video pipeline."""
+
+
+@cli.command()
+@click.option('--video', required=False, type=str, help='MP4 to read, a synthetic 4K sample by default')
+@click.option('--step', required=False, type=float, default=0.2, help='Seconds between extracted frames')
+def seek(video: Optional[str], step: float):
+    """Compare CAP_PROP_POS_FRAMES seeking with keyframe-aware grab() skipping."""
+    video = _sample_or(video)
+    start = time.perf_counter()
+    keyframes = load_keyframe_index(video)
+    click.echo(f'Keyframe index: {len(keyframes)} keyframes in {time.perf_counter() - start:.3f}s')
+
+    checksums = {}
+    for fast_seek in (False, True):
+        slicer = MP4VideoSlicer(video, increment=step, fast_seek=fast_seek)
+        start = time.perf_counter()
+        frames = [(slicer.frame_count, int(frame[::64, ::64].sum())) for ret, frame in slicer if ret]
+        elapsed = time.perf_counter() - start
+        checksums[fast_seek] = frames
+        mode = 'grab/keyframe seek' if fast_seek else 'seek every frame'
+        click.echo(f'{mode:<20} {len(frames):5d} frames {elapsed:7.2f}s {len(frames) / elapsed:7.1f} fps')
+    if checksums[False] != checksums[True]:
+        click.echo('WARNING: modes returned different frames (inexact CAP_PROP_POS_FRAMES seeking)')
+
+
+@cli.command()
+@click.option('--video', required=False, type=str, help='Clip to read, a synthetic 4K sample by default')
+@click.option('--frames', required=False, type=int, default=60, help='Number of frames to process')
+@click.option('--maxwidth', required=False, type=int, default=960, help='Downsample frames to this width first')
+@click.option('--scales', required=False, type=str, default='1,0.5,0.25', help='Comma separated flow scales to try')
+def dense(video: Optional[str], frames: int, maxwidth: int, scales: str):
+    """Farneback presets and scales: frames/s against endpoint error to full-scale 'quality' flow."""
+    gray_frames = read_gray_frames(_sample_or(video), frames, maxwidth)
+    click.echo(f'{len(gray_frames)} frames of {gray_frames[0].shape[1]}x{gray_frames[0].shape[0]}')
+    reference, reference_fps = run_dense_flow(DenseOpticalFlow(preset='quality'), gray_frames)
+    click.echo(f'{"preset":<10} {"scale":>6} {"fps":>8} {"EPE px":>8}')
+    for preset in FARNEBACK_PRESETS:
+        for scale in (float(value) for value in scales.split(',')):
+            if preset == 'quality' and scale == 1:
+                flows, fps = reference, reference_fps
+            else:
+                flows, fps = run_dense_flow(DenseOpticalFlow(preset=preset, scale=scale), gray_frames)
+            click.echo(f'{preset:<10} {scale:>6.2f} {fps:>8.1f} {endpoint_error(flows, reference):>8.3f}')
+
+
+@cli.command()
+@click.option('--video', required=False, type=str, help='Clip to read, a synthetic 4K sample by default')
+@click.option('--frames', required=False, type=int, default=60, help='Number of frames to process')
+@click.option('--maxwidth', required=False, type=int, default=960, help='Downsample frames to this width first')
+def backends(video: Optional[str], frames: int, maxwidth: int):
+    """Every dense flow backend and preset: frames/s and endpoint error to Farneback 'balanced'."""
+    gray_frames = read_gray_frames(_sample_or(video), frames, maxwidth)
+    click.echo(f'{len(gray_frames)} frames of {gray_frames[0].shape[1]}x{gray_frames[0].shape[0]}')
+    reference, _ = run_dense_flow(DenseOpticalFlow(backend='farneback', preset='balanced'), gray_frames)
+    click.echo(f'{"backend":<10} {"preset":<10} {"fps":>8} {"EPE px":>8}')
+    for name, backend in DENSE_FLOW_BACKENDS.items():
+        for preset in backend.PRESETS:
+            flows, fps = run_dense_flow(DenseOpticalFlow(backend=name, preset=preset), gray_frames)
+            click.echo(f'{name:<10} {preset:<10} {fps:>8.1f} {endpoint_error(flows, reference):>8.3f}')
+
+
+@cli.command()
+@click.option('--video', required=False, type=str, help='Clip to read, a synthetic 4K sample by default')
+@click.option('--frames', required=False, type=int, default=60, help='Number of frames to process')
+@click.option('--maxwidth', required=False, type=int, default=960, help='Downsample frames to this width first')
+def warmstart(video: Optional[str], frames: int, maxwidth: int):
+    """Warm-started dense flow against the cold-start path: frames/s and endpoint error to cold start."""
+    gray_frames = read_gray_frames(_sample_or(video), frames, maxwidth)
+    click.echo(f'{len(gray_frames)} frames of {gray_frames[0].shape[1]}x{gray_frames[0].shape[0]}')
+    # (backend, preset, [(warm_levels, warm_iterations), ...])
+    configurations = [
+        ('farneback', 'balanced', [(None, None), (1, None), (None, 1), (1, 1)]),
+        ('farneback', 'fast', [(None, None), (1, None)]),
+        ('dis', 'fast', [(None, None)]),
+        ('dis', 'ultrafast', [(None, None)]),
+    ]
+    click.echo(f'{"backend":<10} {"preset":<10} {"mode":<12} {"fps":>8} {"EPE px":>8}')
+    for backend, preset, warm_options in configurations:
+        cold, fps = run_dense_flow(DenseOpticalFlow(backend=backend, preset=preset), gray_frames)
+        click.echo(f'{backend:<10} {preset:<10} {"cold":<12} {fps:>8.1f} {0:>8.3f}')
+        for levels, iterations in warm_options:
+            processor = DenseOpticalFlow(backend=backend, preset=preset, warm_start=True,
+                                         warm_levels=levels, warm_iterations=iterations)
+            flows, fps = run_dense_flow(processor, gray_frames)
+            mode = 'warm' + ('' if levels is None else f' L{levels}') + ('' if iterations is None else f' I{iterations}')
+            click.echo(f'{backend:<10} {preset:<10} {mode:<12} {fps:>8.1f} {endpoint_error(flows, cold):>8.3f}')
+
+
+if __name__ == '__main__':
+    cli()
@@ -4,6 +4,7 @@
 # - http://opencv-python-tutroals.readthedocs.io/en/latest/py_tutorials/py_gui/py_video_display/py_video_display.html
 
 import os
+import time
 from typing import Optional
 import click
 import cv2
@@ -11,10 +12,14 @@ import numpy as np
 
 from acquisition.video_input import get_video_input
 from postprocessing.generational_sparse_hud import GenerationalSparseHUD
-from postprocessing.sparse_hud import SparseLinesHUD
+from postprocessing.sparse_hud import IdentityHUD, SparseLinesHUD
 from postprocessing.videofile_write import MP4VideoWriter
 from postprocessing.image_hud import ImageHUD
 from processing import optical_flow
+from processing.feature_grid import FeatureGrid
+from processing.flow_backends import DENSE_FLOW_BACKENDS
+from processing.flow_render import FlowLinesRenderer
+from processing.frame_context import FrameContext
 from processing.generational_motion_tracking import GenerationalVectorInference
 from processing.generational_sparse_flow import GenerationalLKFlow
 from processing.motion_tracking import CompoundVectorInferenceSparse
@@ -40,7 +45,18 @@ Hit ESC to exit.
 @click.option('--step', required=False, type=float, help='Interval between captured frames in seconds, each frame if not specified')
 @click.option('--crop', required=False, type=float, help='Percent of HFOV to retain, 100 percent by default')
 @click.option('--maxwidth', required=False, type=int, help='Downsample to maximum width in pixels, no resize by default')
-def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[int], step: Optional[float]):
+@click.option('--prefetch', required=False, type=int, default=0, help='Frames to decode ahead in a background thread, 0 disables')
+@click.option('--replenish', is_flag=True, default=False, help='Refill sparse grid cells with new corners every frame')
+@click.option('--fb-threshold', required=False, type=float, help='Drop LK tracks failing the forward-backward check by more pixels, off by default')
+@click.option('--err-percentile', required=False, type=float, help='Drop LK tracks with error above this percentile, off by default')
+@click.option('--dense-backend', required=False, type=click.Choice(list(DENSE_FLOW_BACKENDS)), default='farneback', help='Dense flow algorithm for modes 1 and 2')
+@click.option('--dense-preset', required=False, type=str, help='Preset of the dense flow backend (farneback: fast/balanced/quality, dis: ultrafast/fast/medium)')
+@click.option('--dense-scale', required=False, type=click.FloatRange(0, 1, min_open=True), default=1.0, help='Compute dense flow on frames downscaled by this factor, e.g. 0.5')
+@click.option('--dense-warm', is_flag=True, default=False, help='Start each dense flow estimate from the previous one')
+@click.option('--no-hud', is_flag=True, default=False, help='Headless run: no window, HUD drawing or video output, motion is printed at the end')
+def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[int], step: Optional[float], prefetch: int, replenish: bool,
+         fb_threshold: Optional[float], err_percentile: Optional[float], dense_backend: str,
+         dense_preset: Optional[str], dense_scale: float, dense_warm: bool, no_hud: bool):
     if image_path is None:
         base_name = ''
     else:
@@ -48,101 +64,85 @@ def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[in
 
     file_name_without_extension = os.path.splitext(base_name)[0]
     flipImage = False
-    camera = get_video_input(image_path, crop=crop, maxwidth=maxwidth)
+    camera = get_video_input(image_path, crop=crop, maxwidth=maxwidth, prefetch=prefetch)
 
-    visuzalizer = ImageHUD()
+    visuzalizer = ImageHUD(headless=no_hud)
     video_writer = MP4VideoWriter(file_name_without_extension)
     
     # Current visualization mode (default: Lucas-Kanade method)
     current_mode = 3
 
-    # FIX THIS
-    create_default_lk_flow = None
-
     CompoundTrackerInstantiator = lambda x: CompoundVectorInferenceSparse(
         initial_motion_vector=x,
         undistort=False
     )
 
     # Create dense optical flow processors
-    dense_flow_hsv = optical_flow.DenseOpticalFlowByHSV()
-    dense_flow_lines = optical_flow.DenseOpticalFlowByLines()
+    dense_params = dict(backend=dense_backend, preset=dense_preset, scale=dense_scale, warm_start=dense_warm)
+    dense_flow_hsv = optical_flow.DenseOpticalFlowByHSV(**dense_params)
+    # Lines are drawn on the color frame below, the processor only computes the flow
+    dense_flow_lines = optical_flow.DenseOpticalFlow(**dense_params)
+    flow_lines_renderer = FlowLinesRenderer(step=16, offset=0, dot_color=(0, 0, 255), min_motion=1)
     
     # Create Lucas-Kanade pipeline
     lk_pipeline = [
-        GenerationalLKFlow(create_default_lk_flow),
+        GenerationalLKFlow(
+            feature_grid=FeatureGrid() if replenish else None,
+            fb_threshold=fb_threshold,
+            err_percentile=err_percentile,
+        ),
         [
             GenerationalVectorInference(CompoundTrackerInstantiator),
         ],
-        GenerationalSparseHUD(),
+        IdentityHUD() if no_hud else GenerationalSparseHUD(),
     ]
 
     frame_count = 0
     unstitched_count = 0
     prev_frame = None
+    start_time = time.perf_counter()
 
     while True:
         frame = camera.capture()
-        if frame is None:
+        # End of input, recorded videos return False
+        if frame is None or frame is False:
             break
 
         if flipImage:
             frame = cv2.flip(frame, 1)
 
-        visuzalizer.setImage(np.copy(frame))
+        # Nothing is drawn without the HUD, the frame does not need a copy
+        visuzalizer.setImage(frame if no_hud else np.copy(frame))
+        # Grayscale conversion is done once per frame and shared by the processors
+        context = FrameContext(frame)
         
         # Process based on current mode
         if current_mode == 1:  # Dense optical flow by HSV
             if prev_frame is not None:
-                # For HSV visualization, we need to convert the flow to a color image
-                _, flow = dense_flow_hsv.apply(frame)
-                # Convert flow to RGB visualization
+                # The processor renders the flow as a color image (hue = direction, value = magnitude)
+                flow_rgb, flow = dense_flow_hsv.apply(context)
                 if flow is not None:
-                    # Create HSV image
-                    h, w = flow.shape[:2]
-                    hsv = np.zeros((h, w, 3), dtype=np.uint8)
-                    hsv[..., 1] = 255  # Saturation is always max
-                    
-                    # Calculate magnitude and angle
-                    mag, ang = cv2.cartToPolar(flow[..., 0], flow[..., 1])
-                    # Normalize magnitude to 0-255
-                    hsv[..., 0] = ang * 180 / np.pi / 2  # Hue is angle
-                    hsv[..., 2] = cv2.normalize(mag, None, 0, 255, cv2.NORM_MINMAX)  # Value is magnitude
-                    
-                    # Convert to BGR
-                    flow_rgb = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
                     visuzalizer.frame = flow_rgb
             
         elif current_mode == 2:  # Dense optical flow by lines
             if prev_frame is not None:
-                # For line visualization, we'll draw the flow on a copy of the original frame
-                _, flow = dense_flow_lines.apply(frame)
+                _, flow = dense_flow_lines.apply(context)
                 if flow is not None:
-                    # Create a copy of the frame to draw on
-                    flow_vis = frame.copy()
-                    
-                    # Draw flow lines
-                    h, w = flow.shape[:2]
-                    step = 16  # Draw a line every 16 pixels
-                    for y in range(0, h, step):
-                        for x in range(0, w, step):
-                            fx, fy = flow[y, x].flatten()
-                            # Only draw significant movements
-                            if abs(fx) > 1 or abs(fy) > 1:
-                                cv2.line(flow_vis, (x, y), (int(x + fx), int(y + fy)), (0, 255, 0), 1)
-                                cv2.circle(flow_vis, (x, y), 1, (0, 0, 255), -1)
-                    
-                    visuzalizer.frame = flow_vis
+                    # Draw flow lines on a copy of the frame, a line every 16 pixels
+                    # for significant movements only
+                    visuzalizer.frame = flow_lines_renderer.draw(frame.copy(), flow)
             
         elif current_mode == 3:  # Lucas-Kanade method
             processor, vector_inferences, inference_hud = lk_pipeline
-            _, processor_result = processor.apply(frame)
+            _, processor_result = processor.apply(context)
             
             visuzalizer.frame = inference_hud.draw_mask(visuzalizer, processor_result)
             
             color_position = 1
             for vector_inference in vector_inferences:
                 vector_results = vector_inference.infer(processor_result)
+                if no_hud:
+                    continue
                 match vector_results:
                     case [motion_vector, initial_vector]:
                         visuzalizer.draw_central_vector(motion_vector, color_position)
@@ -160,6 +160,12 @@ def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[in
                 
                 color_position += 1
 
+        if no_hud:
+            # Headless: nothing to show, record or wait keys for
+            prev_frame = frame
+            frame_count += 1
+            continue
+
         # Display current mode
         visuzalizer.write_uppertext(f"Mode: {current_mode}", 0)
         
@@ -201,9 +207,15 @@ def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[in
             print("Switched to Mode 3: Generational Lucas-Kanade method")
 
     ## finish
+    if no_hud:
+        elapsed = time.perf_counter() - start_time
+        print(f'Processed {frame_count} frames in {elapsed:.1f}s ({frame_count / max(elapsed, 1e-9):.1f} fps)')
+        for vector_inference in lk_pipeline[1]:
+            print(vector_inference.get_title_message())
+            print(vector_inference.get_parameter_message())
     video_writer.cleanup()
     camera.destroy()
-    cv2.destroyWindow('preview')
+    visuzalizer.destroy()
 
 
 if __name__ == '__main__':
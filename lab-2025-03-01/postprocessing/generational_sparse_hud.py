@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 
 from postprocessing.image_hud import ImageHUD
+from processing.flow_render import stamp_points
 from processing.optical_flow import SparseResult
 
 
@@ -30,22 +31,20 @@ class GenerationalSparseHUD:
                 colors[i] = color * (0.9 ** i)
             self.color_palettes.append(colors.astype(int))
 
-    def draw_mask(self, visualizer: ImageHUD, results: List[SparseResult | None]):
-        if self.mask is None:
-            self.mask = np.zeros_like(visualizer.frame)
-        for i, result in enumerate(results):
-            if result is None:
-                continue
-            current_palette = self.color_palettes[i % len(self.color_palettes)]
-            from_pixels, to_pixels = result.old_pixels, result.new_pixels
-            for i, (old_point, new_point) in enumerate(zip(from_pixels, to_pixels)):
-                a, b = new_point.ravel()
-                c, d = old_point.ravel()
-                color = current_palette[i % len(current_palette)].tolist()
-                # self.mask = cv2.line(self.mask, (int(a), int(b)), (int(c), int(d)), color, 2)
-                visualizer.frame = cv2.circle(visualizer.frame, (int(a), int(b)), 5, color, -1)
-        visualized_image = cv2.add(visualizer.frame, self.mask)
-        return visualized_image
+    def draw_mask(self, visualizer: ImageHUD, results: List[SparseResult]):
+        # All generations are drawn at once: points are truncated to pixels in one go
+        # and stamped with their colors in a single assignment
+        points, colors = [], []
+        for result in results:
+            # Palette follows the generation, not its position among the live ones
+            current_palette = self.color_palettes[result.generation % len(self.color_palettes)]
+            to_pixels = result.new_pixels.reshape(-1, 2)
+            points.append(to_pixels)
+            colors.append(current_palette[np.arange(len(to_pixels)) % len(current_palette)])
+        if points:
+            stamp_points(visualizer.frame, np.concatenate(points).astype(np.int32), 5, np.concatenate(colors))
+        # Trails are not drawn (see draw_subvectors), the mask stays empty and is not added
+        return visualizer.frame
 
     # def draw_subvectors(self, visualizer: ImageHUD, subvector_generations: List[List[SparseResult] | None]):
     #     # Incorrect implementation, change this
@@ -2,7 +2,9 @@ import cv2
 import numpy as np
 
 class ImageHUD:
-    def __init__(self) -> None:
+    '''headless: no preview window, render() and destroy() do nothing (for runs without a display)'''
+    def __init__(self, headless=False) -> None:
+        self.headless = headless
         self.font = cv2.FONT_HERSHEY_SIMPLEX
         self.font_scale = 0.4
         self.lower_font_scale = 0.30
@@ -19,16 +21,19 @@ class ImageHUD:
         self.yoffset = 20
         self.thickness = 1
         self.boxwidth = 100
-        cv2.namedWindow('preview')
+        if not headless:
+            cv2.namedWindow('preview')
 
     def setImage(self, frame: cv2.typing.MatLike):
         self.frame = frame
 
     def render(self):
-        cv2.imshow('preview', self.frame)
+        if not self.headless:
+            cv2.imshow('preview', self.frame)
 
     def destroy(self):
-        cv2.destroyWindow('preview')
+        if not self.headless:
+            cv2.destroyWindow('preview')
 
     @property
     def centerpoint(self):
@@ -3,6 +3,7 @@ import cv2
 import numpy as np
 
 from postprocessing.image_hud import ImageHUD
+from processing.flow_render import draw_segments, stamp_points
 from processing.optical_flow import SparseResult
 
 
@@ -22,15 +23,14 @@ class SparseLinesHUD:
         self.colors = colors.astype(int)
 
     def draw_mask(self, visualizer: ImageHUD, result: SparseResult):
-        from_pixels, to_pixels = result.old_pixels, result.new_pixels
+        # Points are truncated to pixels once, and drawn color by color
+        from_pixels = result.old_pixels.reshape(-1, 2).astype(np.int32)
+        to_pixels = result.new_pixels.reshape(-1, 2).astype(np.int32)
         if self.mask is None:
             self.mask = np.zeros_like(visualizer.frame)
-        for i, (old_point, new_point) in enumerate(zip(from_pixels, to_pixels)):
-            a, b = new_point.ravel()
-            c, d = old_point.ravel()
-            color = self.colors[i % len(self.colors)].tolist()
-            self.mask = cv2.line(self.mask, (int(a), int(b)), (int(c), int(d)), color, 2)
-            visualizer.frame = cv2.circle(visualizer.frame, (int(a), int(b)), 5, color, -1)
+        draw_segments(self.mask, to_pixels, from_pixels, self.colors, 2)
+        point_colors = self.colors[np.arange(len(to_pixels)) % len(self.colors)]
+        stamp_points(visualizer.frame, to_pixels, 5, point_colors)
         visualized_image = cv2.add(visualizer.frame, self.mask)
         # visualizer.frame = visualized_image
         return visualized_image
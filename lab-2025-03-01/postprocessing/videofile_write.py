@@ -76,4 +76,5 @@ class MP4VideoWriter:
         os.chdir(cwd)
 
     def cleanup(self):
-        self.video_out.release()
+        if self.video_out is not None:
+            self.video_out.release()
@@ -1,5 +1,6 @@
 from typing import Optional
 import click
+import cv2
 
 from preprocessing.video_slicing import MP4VideoPreprocessor
 
@@ -11,17 +12,27 @@ from preprocessing.video_slicing import MP4VideoPreprocessor
 @click.option(
     '--output',
     required=False,
-    type=click.Choice(['VIDEO', 'JPG', 'ALL'], case_sensitive=False),
-    help='Output either `video`, `jpg`, or `all`. Default is no output to disk'
+    type=click.Choice(['VIDEO', 'JPG', 'ALL', 'FRAMES'], case_sensitive=False),
+    help='Output either `video`, `jpg`, `all`, or `frames` (raw memory-mapped cache for fast replays). '
+         'Default is no output to disk'
 )
-def main(image_path: str, crop: Optional[float], maxwidth: Optional[int], output: Optional[str]):
+@click.option(
+    '--workers',
+    required=False,
+    type=int,
+    default=0,
+    help='JPEG encoder threads; > 0 pipelines decoding, crop/resize and encoding. Sequential by default'
+)
+@click.option('--area', is_flag=True, default=False, help='Downsample with INTER_AREA (sharper, slower) instead of bilinear')
+def main(image_path: str, crop: Optional[float], maxwidth: Optional[int], output: Optional[str], workers: int, area: bool):
     """
     Usage:
     $ python preprocess_video.py --image_path=xxx.MP4 --step=50
     Will produce video and images timelapsed with 50 seconds interval
     """
-    preprocessor = MP4VideoPreprocessor(image_path, crop_factor=crop, resize_maxwidth=maxwidth)
-    preprocessor.process(output)
+    interpolation = cv2.INTER_AREA if area else cv2.INTER_LINEAR
+    preprocessor = MP4VideoPreprocessor(image_path, crop_factor=crop, resize_maxwidth=maxwidth, interpolation=interpolation)
+    preprocessor.process(output, workers=workers)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,83 @@
+import struct
+from dataclasses import dataclass
+import numpy as np
+
+# Raw frame cache (.frames):
+#   64-byte header: magic, version, frame count, height, width, channels, fps,
+#                   offset of the frame data, offset of the index
+#   frames:         count * height * width * channels uint8, C order, back to back
+#   index:          count int64 source frame numbers (timestamp = number / fps)
+MAGIC = b'FRMCACHE'
+VERSION = 1
+HEADER_FORMAT = '<8sIIIIIdQQ'
+HEADER_SIZE = 64
+FRAME_CACHE_EXTENSION = '.frames'
+
+
+@dataclass
+class FrameCacheHeader:
+    count: int
+    height: int
+    width: int
+    channels: int
+    fps: float
+    data_offset: int
+    index_offset: int
+
+    def pack(self) -> bytes:
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, self.count, self.height, self.width,
+                             self.channels, self.fps, self.data_offset, self.index_offset)
+        return header.ljust(HEADER_SIZE, b'\0')
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'FrameCacheHeader':
+        magic, version, *fields = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MAGIC:
+            raise ValueError('Not a frame cache file')
+        if version != VERSION:
+            raise ValueError(f'Unsupported frame cache version {version}')
+        return cls(*fields)
+
+
+class FrameCacheWriter:
+    """Appends equally sized uint8 frames to a .frames file; the header is finalized on close()."""
+
+    def __init__(self, path: str, height: int, width: int, channels: int, fps: float) -> None:
+        self.path = path
+        self.header = FrameCacheHeader(0, height, width, channels, fps, HEADER_SIZE, 0)
+        self._frame_numbers = []
+        self._file = open(path, 'wb')
+        self._file.write(self.header.pack())
+
+    def write(self, frame: np.ndarray, frame_number: int):
+        shape = (self.header.height, self.header.width, self.header.channels)
+        if frame.reshape(frame.shape[:2] + (-1,)).shape != shape or frame.dtype != np.uint8:
+            raise ValueError(f'Frame {frame.shape} {frame.dtype} does not match cache {shape} uint8')
+        self._file.write(np.ascontiguousarray(frame).data)
+        self._frame_numbers.append(frame_number)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self.header.count = len(self._frame_numbers)
+        self.header.index_offset = self._file.tell()
+        self._file.write(np.asarray(self._frame_numbers, dtype='<i8').tobytes())
+        self._file.seek(0)
+        self._file.write(self.header.pack())
+        self._file.close()
+
+
+def open_frame_cache(path: str) -> tuple[FrameCacheHeader, np.ndarray, np.ndarray]:
+    """
+    Map a .frames file. Returns the header, a (count, height, width, channels) uint8 array
+    backed by the file and the int64 source frame numbers. The mapping is copy-on-write:
+    frames can be modified in place without touching the file.
+    """
+    with open(path, 'rb') as f:
+        header = FrameCacheHeader.unpack(f.read(HEADER_SIZE))
+    shape = (header.count, header.height, header.width, header.channels)
+    if header.count == 0:
+        return header, np.empty(shape, np.uint8), np.empty(0, np.int64)
+    frames = np.memmap(path, dtype=np.uint8, mode='c', offset=header.data_offset, shape=shape)
+    index = np.memmap(path, dtype='<i8', mode='r', offset=header.index_offset, shape=(header.count,))
+    return header, frames, np.asarray(index)
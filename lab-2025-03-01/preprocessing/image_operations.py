@@ -1,4 +1,6 @@
+from typing import Optional
 import cv2
+import numpy as np
 
 
 def resize_cv_image_to_maxwidth(image: cv2.typing.MatLike, max_width: int) -> cv2.typing.MatLike:
@@ -33,3 +35,82 @@ def crop_cv_image_centered(image: cv2.typing.MatLike, crop_percentage: float) ->
     cropped_image = image[start_y:end_y, start_x:end_x]
 
     return cropped_image
+
+
+class CropResize:
+    """
+    Centered crop followed by downscale to a maximum width, as one operation.
+
+    Same geometry as crop_cv_image_centered + resize_cv_image_to_maxwidth, but the ROI
+    and output size are computed once per source resolution, the crop is a view (no copy),
+    and the result is written by a single cv2.resize call. INTER_AREA may be chosen as
+    interpolation, it is better suited for downscaling.
+
+    With frame_buffers > 0 results are written into a ring of that many preallocated
+    images, so a returned frame is overwritten frame_buffers calls later. Only enable it
+    when no consumer keeps frames longer than that; 0 allocates a new image per frame.
+    """
+
+    def __init__(
+        self,
+        crop_factor: Optional[float] = None,
+        max_width: Optional[int] = None,
+        interpolation: int = cv2.INTER_LINEAR,
+        frame_buffers: int = 0,
+    ) -> None:
+        self.crop_factor = 1.0 if crop_factor is None else crop_factor
+        self.max_width = max_width
+        self.interpolation = interpolation
+        self.frame_buffers = frame_buffers
+        self._source_shape = None
+        self._roi = None
+        self._output_size = None
+        self._ring = []
+        self._ring_position = 0
+
+    def reserve(self, frame_buffers: int):
+        """Reuse a ring of at least `frame_buffers` output images (e.g. as many as can be queued downstream)."""
+        if self.frame_buffers < frame_buffers:
+            self.frame_buffers = frame_buffers
+            self._ring = []
+
+    def _crop_size(self, height: int, width: int) -> tuple[int, int]:
+        return int(width * self.crop_factor), int(height * self.crop_factor)
+
+    def output_size(self, height: int, width: int) -> tuple[int, int]:
+        """(width, height) of the result for a source of the given size."""
+        crop_width, crop_height = self._crop_size(height, width)
+        if self.max_width is not None and crop_width > self.max_width:
+            return self.max_width, int(crop_height * (self.max_width / crop_width))
+        return crop_width, crop_height
+
+    def _plan(self, shape):
+        height, width = shape[:2]
+        crop_width, crop_height = self._crop_size(height, width)
+        start_x = (width - crop_width) // 2
+        start_y = (height - crop_height) // 2
+        self._roi = (slice(start_y, start_y + crop_height), slice(start_x, start_x + crop_width))
+        output_size = self.output_size(height, width)
+        self._output_size = output_size if output_size != (crop_width, crop_height) else None
+        self._source_shape = shape
+        self._ring = []
+
+    def _next_buffer(self, shape, dtype):
+        if self.frame_buffers <= 0:
+            return None
+        if not self._ring:
+            self._ring = [np.empty(shape, dtype) for _ in range(self.frame_buffers)]
+            self._ring_position = 0
+        buffer = self._ring[self._ring_position]
+        self._ring_position = (self._ring_position + 1) % len(self._ring)
+        return buffer
+
+    def __call__(self, frame: cv2.typing.MatLike) -> cv2.typing.MatLike:
+        if frame.shape != self._source_shape:
+            self._plan(frame.shape)
+        image = frame[self._roi]
+        if self._output_size is None:
+            return image
+        width, height = self._output_size
+        return cv2.resize(image, (width, height), dst=self._next_buffer((height, width) + frame.shape[2:], frame.dtype),
+                          interpolation=self.interpolation)
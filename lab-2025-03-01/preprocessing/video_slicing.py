@@ -1,15 +1,80 @@
+import bisect
+import json
 import time
+import queue
+import threading
 from typing import Optional
 import click
 import cv2
 import math
 import os
 
-from preprocessing.image_operations import crop_cv_image_centered, resize_cv_image_to_maxwidth
+from preprocessing.frame_cache import FRAME_CACHE_EXTENSION, FrameCacheWriter
+from preprocessing.image_operations import CropResize
+
+
+# x264 default keyint, used when the keyframe index cannot be built
+DEFAULT_GOP_SIZE = 250
+
+
+def build_keyframe_index(video_path: str) -> list[int]:
+    """
+    Frame numbers (presentation order) of the keyframes, read from packet flags and
+    timestamps without decoding (FFmpeg backend raw mode).
+
+    Packets come in decode order, which differs from presentation order when the
+    stream has B-frames, so each packet's frame number is the rank of its
+    presentation timestamp. Empty if the backend cannot report keyframes or timestamps.
+    """
+    capture = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [cv2.CAP_PROP_FORMAT, -1])
+    timestamps = []
+    is_keyframe = []
+    try:
+        while capture.grab():
+            timestamps.append(capture.get(cv2.CAP_PROP_PTS))
+            is_keyframe.append(bool(capture.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME)))
+    finally:
+        capture.release()
+    if any(math.isnan(pts) or pts < 0 for pts in timestamps) or len(set(timestamps)) != len(timestamps):
+        return []  # no usable presentation order, seeking falls back to the GOP size
+    frame_numbers = {pts: number for number, pts in enumerate(sorted(timestamps))}
+    return sorted(frame_numbers[pts] for pts, key in zip(timestamps, is_keyframe) if key)
+
+
+def load_keyframe_index(video_path: str) -> list[int]:
+    """build_keyframe_index cached in a `<video>.keyframes.json` sidecar, rebuilt when the video changes."""
+    sidecar = f'{video_path}.keyframes.json'
+    stat = os.stat(video_path)
+    # version 2: presentation order (version 1 indexed packets in decode order)
+    signature = {'size': stat.st_size, 'mtime': stat.st_mtime, 'version': 2}
+    try:
+        with open(sidecar) as f:
+            cached = json.load(f)
+        if cached.get('signature') == signature:
+            return cached['keyframes']
+    except (OSError, ValueError, KeyError):
+        pass
+    keyframes = build_keyframe_index(video_path)
+    try:
+        with open(sidecar, 'w') as f:
+            json.dump({'signature': signature, 'keyframes': keyframes}, f)
+    except OSError:
+        pass  # read-only location, index is rebuilt next time
+    return keyframes
 
 
 class MP4VideoSlicer:
-    def __init__(self, video_path, autoincrement=True, increment=None, crop_factor=None, resize_maxwidth=None) -> None:
+    def __init__(self, video_path, autoincrement=True, increment=None, crop_factor=None, resize_maxwidth=None,
+                 fast_seek=True, gop_size=None, interpolation=cv2.INTER_LINEAR, frame_buffers=0) -> None:
+        """
+        fast_seek: when stepping by `increment` / `next_step_seconds`, skip forward with grab()
+        (no color conversion) and only seek when a keyframe lies between the current position
+        and the target. Without a keyframe index, seeks when the jump exceeds `gop_size`.
+
+        frame_buffers > 0 writes cropped/resized frames into a ring of that many reused images
+        (see CropResize), a frame then stays valid only for that many further frames. Off by
+        default, iterating callers may keep the frames they get.
+        """
         capture_source = cv2.VideoCapture(video_path)
         if crop_factor is None:
             crop_factor = 1.0
@@ -20,28 +85,37 @@ class MP4VideoSlicer:
         width = int(capture_source.get(3))
         height = int(capture_source.get(4))
 
-        is_should_resize = resize_maxwidth is not None and width > resize_maxwidth
-        self.should_preprocess = True if is_should_resize or crop_factor != 1 else False
-
-        if is_should_resize:
-            scale_factor = resize_maxwidth / width
-            resized_height = int(height * scale_factor)
-            self.video_width_px = resize_maxwidth
-            self.video_height_px = resized_height
-        else:
-            self.video_width_px = width
-            self.video_height_px = height
+        self.crop_resize = CropResize(crop_factor, resize_maxwidth, interpolation=interpolation,
+                                      frame_buffers=frame_buffers)
+        self.video_width_px, self.video_height_px = self.crop_resize.output_size(height, width)
+        self.should_preprocess = (self.video_width_px, self.video_height_px) != (width, height)
 
         self.capture_source = capture_source
         self.next_step_seconds = 0.0
         self.frame_count = 0
         self.autoincrement = autoincrement
         self.increment = increment
+        self.video_path = video_path
+        self.fast_seek = fast_seek
+        self.gop_size = gop_size
+        self._keyframes: Optional[list[int]] = None
+        # Frame number the next capture_source.read() returns
+        self._decoder_frame = 0
 
     def __iter__(self):
         return self
     
     def __next__(self):
+        ret, frame = self.read_raw()
+        if ret and self.should_preprocess:
+            frame = self.preprocess(frame)
+        return ret, frame
+
+    def preprocess(self, frame):
+        return self.crop_resize(frame)
+
+    def read_raw(self):
+        """Decode the next frame without crop/resize; advances frame_count."""
         if self.autoincrement:
             if self.increment is None:
                 next_frame_count = self.frame_count + 1
@@ -57,19 +131,66 @@ class MP4VideoSlicer:
         if self.autoincrement and self.increment is None:
             # Reading frame one by one does not require setting CAP_PROP_POS_FRAMES
             ret, frame = self.capture_source.read()
+            self._decoder_frame += 1
         else:
-            self.capture_source.set(cv2.CAP_PROP_POS_FRAMES, next_frame_count)
-            ret, frame = self.capture_source.read()
+            ret, frame = self._read_at(next_frame_count)
 
-        if self.should_preprocess:
-            frame = resize_cv_image_to_maxwidth(crop_cv_image_centered(frame, self.crop_factor), max_width=self.video_width_px)
         self.frame_count = next_frame_count
         return ret, frame
     
+    def _should_seek(self, target: int) -> bool:
+        skip = target - self._decoder_frame
+        if not self.fast_seek or skip < 0:
+            return True
+        if self._keyframes is None:
+            self._keyframes = load_keyframe_index(self.video_path) if self.gop_size is None else []
+        if not self._keyframes:
+            return skip > (self.gop_size or DEFAULT_GOP_SIZE)
+        # A seek restarts decoding at the last keyframe before the target; worth it only
+        # if that keyframe is past the current decoder position
+        keyframe = self._keyframes[max(0, bisect.bisect_right(self._keyframes, target) - 1)]
+        return keyframe > self._decoder_frame
+
+    def _read_at(self, target: int):
+        if self._should_seek(target):
+            self.capture_source.set(cv2.CAP_PROP_POS_FRAMES, target)
+        else:
+            for _ in range(target - self._decoder_frame):
+                if not self.capture_source.grab():
+                    return False, None
+        self._decoder_frame = target + 1
+        return self.capture_source.read()
+
     def cleanup(self):
         self.capture_source.release()
 
 
+class _StageStats:
+    """Frames handled and time spent working by one pipeline stage (possibly several threads)."""
+
+    def __init__(self, name: str, threads: int = 1) -> None:
+        self.name = name
+        self.threads = threads
+        self.frames = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.frames += 1
+            self.busy_seconds += seconds
+
+    @property
+    def fps(self) -> float:
+        """Frames per second the stage can sustain with all of its threads busy."""
+        if self.busy_seconds == 0:
+            return 0.0
+        return self.frames * self.threads / self.busy_seconds
+
+
+_STOP = object()
+
+
 # TODO: Replace the logic with MP4VideoWriter, refactor into glue class using MP4VideoSlicer directly
 # and MP4VideoWriter.
 class MP4VideoPreprocessor(MP4VideoSlicer):
@@ -80,15 +201,34 @@ class MP4VideoPreprocessor(MP4VideoSlicer):
         increment=None,
         crop_factor=None,
         resize_maxwidth=None,
+        interpolation=cv2.INTER_LINEAR,
     ) -> None:
-        super().__init__(video_path, autoincrement, increment, crop_factor, resize_maxwidth)
+        super().__init__(video_path, autoincrement, increment, crop_factor, resize_maxwidth, interpolation=interpolation)
         base_name = os.path.basename(video_path)
         file_name_without_extension = os.path.splitext(base_name)[0]
         self.task_name = file_name_without_extension
         self.video_out = None
+        self.frame_cache_out = None
+
+
+    def jpg_filename(self, frame_count: int) -> str:
+        current_frame_time_seconds = frame_count / self.video_fps
+        hours = int(current_frame_time_seconds // 3600)
+        minutes = int((current_frame_time_seconds % 3600) // 60)
+        seconds = int(current_frame_time_seconds % 60)
+        milliseconds = int((current_frame_time_seconds - int(current_frame_time_seconds)) * 1000)
+        return f'output_{self.video_width_px}x{self.video_height_px}_{hours:02d}_{minutes:02d}_{seconds:02d}_{milliseconds:03d}.jpg'
 
+    def process(self, output_format: Optional[str], workers: int = 0):
+        """
+        Write the frames as VIDEO, JPG or ALL into outputs/<task>_<w>x<h>/.
+        FRAMES writes a raw memory-mapped frame cache instead (see preprocessing/frame_cache.py),
+        which MemmapFrameInput replays without decoding.
 
-    def process(self, output_format: Optional[str]):
+        With workers > 0 decoding, crop/resize and JPEG encoding run in separate threads
+        connected by bounded queues, with `workers` JPEG encoder threads; the video is
+        still written in frame order and JPEG names depend only on the frame time.
+        """
         if output_format is not None:
             path = f'outputs'
             folder = f'{self.task_name}_{self.video_width_px}x{self.video_height_px}'
@@ -113,16 +253,152 @@ class MP4VideoPreprocessor(MP4VideoSlicer):
                     (self.video_width_px, self.video_height_px)
                 )
 
-        for ret, frame in self:
-            if ret:
-                if output_format in ['VIDEO', 'ALL']:
+            if output_format == 'FRAMES':
+                self.frame_cache_out = FrameCacheWriter(
+                    f'{self.task_name}_{self.video_width_px}x{self.video_height_px}{FRAME_CACHE_EXTENSION}',
+                    self.video_height_px,
+                    self.video_width_px,
+                    3,
+                    self.video_fps,
+                )
+
+        try:
+            if workers > 0:
+                return self._process_pipelined(output_format, workers)
+            for ret, frame in self:
+                if ret:
+                    if output_format in ['VIDEO', 'ALL']:
+                        self.video_out.write(frame)
+                    if output_format in ['JPG', 'ALL']:
+                        cv2.imwrite(self.jpg_filename(self.frame_count), frame)
+                    if self.frame_cache_out is not None:
+                        self.frame_cache_out.write(frame, self.frame_count)
+        finally:
+            if self.video_out is not None:
+                self.video_out.release()
+                self.video_out = None
+            if self.frame_cache_out is not None:
+                self.frame_cache_out.close()
+                self.frame_cache_out = None
+
+    def _process_pipelined(self, output_format: Optional[str], workers: int, queue_size: int = 8):
+        write_video = output_format in ['VIDEO', 'ALL', 'FRAMES']
+        write_jpg = output_format in ['JPG', 'ALL']
+        decoded = queue.Queue(maxsize=queue_size)
+        to_encode = queue.Queue(maxsize=queue_size * workers)
+        to_video = queue.Queue(maxsize=queue_size)
+        # Each frame is encoded/written once and dropped, so output images can be reused; every
+        # frame that can be queued or in use by an encoder/writer keeps its own buffer
+        self.crop_resize.reserve(queue_size * workers + queue_size + workers + 3)
+        stats = {
+            'decode': _StageStats('decode'),
+            'preprocess': _StageStats('preprocess'),
+            'jpeg': _StageStats('jpeg', workers),
+            'video': _StageStats('video'),
+        }
+        errors = []
+        failed = threading.Event()
+
+        def put(q, item):
+            # Give up instead of blocking forever once another stage has failed
+            while not failed.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def get(q):
+            while not failed.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            return _STOP
+
+        def stage(body):
+            def run():
+                try:
+                    body()
+                except Exception as e:
+                    errors.append(e)
+                    failed.set()
+            return run
+
+        def decode():
+            try:
+                while not failed.is_set():
+                    start = time.perf_counter()
+                    try:
+                        ret, frame = self.read_raw()
+                    except StopIteration:
+                        break
+                    if ret:
+                        stats['decode'].add(time.perf_counter() - start)
+                        put(decoded, (self.frame_count, frame))
+            finally:
+                put(decoded, _STOP)
+
+        def preprocess():
+            try:
+                while True:
+                    item = get(decoded)
+                    if item is _STOP:
+                        break
+                    frame_count, frame = item
+                    start = time.perf_counter()
+                    if self.should_preprocess:
+                        frame = self.preprocess(frame)
+                    stats['preprocess'].add(time.perf_counter() - start)
+                    if write_jpg:
+                        put(to_encode, (frame_count, frame))
+                    if write_video:
+                        put(to_video, (frame_count, frame))
+            finally:
+                for _ in range(workers):
+                    put(to_encode, _STOP)
+                put(to_video, _STOP)
+
+        def encode():
+            while True:
+                item = get(to_encode)
+                if item is _STOP:
+                    break
+                frame_count, frame = item
+                start = time.perf_counter()
+                cv2.imwrite(self.jpg_filename(frame_count), frame)
+                stats['jpeg'].add(time.perf_counter() - start)
+
+        def write():
+            # Single thread, so the video and the frame cache keep frame order
+            while True:
+                item = get(to_video)
+                if item is _STOP:
+                    break
+                frame_count, frame = item
+                start = time.perf_counter()
+                if self.video_out is not None:
                     self.video_out.write(frame)
-                if output_format in ['JPG', 'ALL']:
-                    current_frame_time_seconds = self.frame_count / self.video_fps
-                    hours = int(current_frame_time_seconds // 3600)
-                    minutes = int((current_frame_time_seconds % 3600) // 60)
-                    seconds = int(current_frame_time_seconds % 60)
-                    milliseconds = int((current_frame_time_seconds - int(current_frame_time_seconds)) * 1000)
-                    filename = f'output_{self.video_width_px}x{self.video_height_px}_{hours:02d}_{minutes:02d}_{seconds:02d}_{milliseconds:03d}.jpg'
-                    cv2.imwrite(filename, frame)
-        self.video_out.release()
+                if self.frame_cache_out is not None:
+                    self.frame_cache_out.write(frame, frame_count)
+                stats['video'].add(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=stage(decode), name='decode'),
+                   threading.Thread(target=stage(preprocess), name='preprocess'),
+                   threading.Thread(target=stage(write), name='video-writer')]
+        threads += [threading.Thread(target=stage(encode), name=f'jpeg-{i}') for i in range(workers)]
+        wall_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_seconds = time.perf_counter() - wall_start
+        if errors:
+            raise errors[0]
+
+        frames = stats['decode'].frames
+        print(f'Processed {frames} frames in {wall_seconds:.2f}s ({frames / wall_seconds if wall_seconds else 0:.1f} fps)')
+        for stage_stats in stats.values():
+            if stage_stats.frames:
+                print(f'  {stage_stats.name:<10} {stage_stats.fps:8.1f} fps ({stage_stats.threads} thread(s))')
+        return stats
@@ -0,0 +1,64 @@
+from typing import Optional
+import numpy as np
+import cv2
+
+
+class FeatureGrid:
+    '''
+    Grid-based replenishment of tracked corners. The frame is split into rows x cols
+    cells; cells holding fewer than `min_per_cell` tracked points get new Shi-Tomasi
+    corners, detected on the cell only (the cost scales with the empty area, not the
+    frame) and masked around the existing points so tracks are not duplicated.
+    '''
+    def __init__(self, rows: int = 4, cols: int = 4, min_per_cell: int = 3, feature_params: Optional[dict] = None):
+        if feature_params is None:
+            feature_params = dict( maxCorners = 100,
+                                   qualityLevel = 0.3,
+                                   minDistance = 7,
+                                   blockSize = 7 )
+        self.rows = rows
+        self.cols = cols
+        self.min_per_cell = min_per_cell
+        self.feature_params = feature_params
+        # Corner budget of one cell, the whole grid detects about as many as one full-frame detection
+        self.corners_per_cell = max(min_per_cell, feature_params.get('maxCorners', 100) // (rows * cols))
+
+    def cell_counts(self, shape, points: np.ndarray) -> np.ndarray:
+        '''Number of points in each cell, (rows, cols)'''
+        h, w = shape[:2]
+        points = points.reshape(-1, 2)
+        if len(points) == 0:
+            return np.zeros((self.rows, self.cols), dtype=int)
+        col = np.clip((points[:, 0] * self.cols / w).astype(int), 0, self.cols - 1)
+        row = np.clip((points[:, 1] * self.rows / h).astype(int), 0, self.rows - 1)
+        return np.bincount(row * self.cols + col, minlength=self.rows * self.cols).reshape(self.rows, self.cols)
+
+    def replenish(self, frame_gray: np.ndarray, points: np.ndarray) -> np.ndarray:
+        '''New corners for the sparse cells of frame_gray as a (k, 1, 2) float32 array, possibly empty'''
+        h, w = frame_gray.shape[:2]
+        points = points.reshape(-1, 2)
+        counts = self.cell_counts(frame_gray.shape, points)
+        sparse_cells = np.argwhere(counts < self.min_per_cell)
+        if len(sparse_cells) == 0:
+            return np.empty((0, 1, 2), dtype=np.float32)
+
+        mask = np.full((h, w), 255, dtype=np.uint8)
+        radius = max(1, int(self.feature_params.get('minDistance', 7)))
+        for x, y in points.astype(int):
+            cv2.circle(mask, (int(x), int(y)), radius, 0, -1)
+
+        ys = np.linspace(0, h, self.rows + 1).astype(int)
+        xs = np.linspace(0, w, self.cols + 1).astype(int)
+        params = dict(self.feature_params)
+        new_points = []
+        for row, col in sparse_cells:
+            y0, y1, x0, x1 = ys[row], ys[row + 1], xs[col], xs[col + 1]
+            if not mask[y0:y1, x0:x1].any():
+                continue
+            params['maxCorners'] = self.corners_per_cell - int(counts[row, col])
+            corners = cv2.goodFeaturesToTrack(frame_gray[y0:y1, x0:x1], mask=mask[y0:y1, x0:x1], **params)
+            if corners is not None:
+                new_points.append(corners + np.array([x0, y0], dtype=np.float32))
+        if not new_points:
+            return np.empty((0, 1, 2), dtype=np.float32)
+        return np.concatenate(new_points).astype(np.float32)
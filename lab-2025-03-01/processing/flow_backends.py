@@ -0,0 +1,111 @@
+from typing import Optional
+import numpy as np
+import cv2
+
+
+# Parameters of cv2.calcOpticalFlowFarneback, 'balanced' is the set used before presets existed
+FARNEBACK_PRESETS = {
+    'fast': dict(pyr_scale=0.5, levels=2, winsize=9, iterations=1, poly_n=5, poly_sigma=1.1, flags=0),
+    'balanced': dict(pyr_scale=0.5, levels=3, winsize=15, iterations=3, poly_n=5, poly_sigma=1.2, flags=0),
+    'quality': dict(pyr_scale=0.5, levels=5, winsize=21, iterations=5, poly_n=7, poly_sigma=1.5, flags=0),
+}
+
+
+class FlowBackend:
+    '''
+    Dense optical flow algorithm: flow between two equally sized grayscale images, in their pixels.
+    calc() may be given an initial estimate of the flow (e.g. the previous one) to start from.
+    '''
+    PRESETS: dict = {}
+    DEFAULT_PRESET: str = ''
+
+    def __init__(self, preset: Optional[str] = None):
+        preset = self.DEFAULT_PRESET if preset is None else preset
+        if preset not in self.PRESETS:
+            raise ValueError(f'Unknown {self.__class__.__name__} preset {preset!r}, use one of {list(self.PRESETS)}')
+        self.preset = preset
+
+    def calc(self, prev: np.ndarray, next: np.ndarray, initial_flow: Optional[np.ndarray] = None) -> np.ndarray:
+        raise NotImplementedError()
+
+
+class FarnebackBackend(FlowBackend):
+    '''
+    warm_levels, warm_iterations: pyramid levels and iterations per level to use when started
+    from an initial flow; the coarse levels and extra iterations mostly recover motion the
+    initial estimate already holds. The preset's values by default.
+    '''
+    PRESETS = FARNEBACK_PRESETS
+    DEFAULT_PRESET = 'balanced'
+
+    def __init__(self, preset: Optional[str] = None, params: Optional[dict] = None,
+                 warm_levels: Optional[int] = None, warm_iterations: Optional[int] = None):
+        super().__init__(preset)
+        self.params = dict(self.PRESETS[self.preset], **(params or {}))
+        self.warm_params = dict(self.params, flags=self.params['flags'] | cv2.OPTFLOW_USE_INITIAL_FLOW)
+        if warm_levels is not None:
+            self.warm_params['levels'] = warm_levels
+        if warm_iterations is not None:
+            self.warm_params['iterations'] = warm_iterations
+
+    def calc(self, prev, next, initial_flow=None):
+        if initial_flow is None:
+            return cv2.calcOpticalFlowFarneback(prev, next, None, **self.params)
+        # The flow is refined in place, the caller's estimate is left untouched
+        return cv2.calcOpticalFlowFarneback(prev, next, initial_flow.copy(), **self.warm_params)
+
+
+class DISBackend(FlowBackend):
+    '''Dense Inverse Search (cv2.DISOpticalFlow), much faster than Farneback on CPU'''
+    PRESETS = {
+        'ultrafast': cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST,
+        'fast': cv2.DISOPTICAL_FLOW_PRESET_FAST,
+        'medium': cv2.DISOPTICAL_FLOW_PRESET_MEDIUM,
+    }
+    DEFAULT_PRESET = 'fast'
+
+    def __init__(self, preset: Optional[str] = None):
+        super().__init__(preset)
+        self.dis = cv2.DISOpticalFlow_create(self.PRESETS[self.preset])
+
+    def calc(self, prev, next, initial_flow=None):
+        # DIS needs continuous images, ROI views are copied; a given flow is used as initial estimate
+        initial_flow = None if initial_flow is None else initial_flow.copy()
+        return self.dis.calc(np.ascontiguousarray(prev), np.ascontiguousarray(next), initial_flow)
+
+
+class TVL1Backend(FlowBackend):
+    '''Dual TV-L1 flow from opencv-contrib (cv2.optflow), accurate but slow'''
+    PRESETS = {
+        'fast': dict(nscales=3, warps=3),
+        'default': {},
+    }
+    DEFAULT_PRESET = 'default'
+
+    def __init__(self, preset: Optional[str] = None):
+        super().__init__(preset)
+        self.tvl1 = cv2.optflow.DualTVL1OpticalFlow_create(**self.PRESETS[self.preset])
+        self.warm_tvl1 = cv2.optflow.DualTVL1OpticalFlow_create(**self.PRESETS[self.preset], useInitialFlow=True)
+
+    def calc(self, prev, next, initial_flow=None):
+        if initial_flow is None:
+            return self.tvl1.calc(prev, next, None)
+        return self.warm_tvl1.calc(prev, next, initial_flow.copy())
+
+
+DENSE_FLOW_BACKENDS = {
+    'farneback': FarnebackBackend,
+    'dis': DISBackend,
+}
+# TV-L1 is only shipped with opencv-contrib-python
+if hasattr(cv2, 'optflow'):
+    DENSE_FLOW_BACKENDS['tvl1'] = TVL1Backend
+
+
+def create_flow_backend(backend='farneback', preset: Optional[str] = None, **kwargs) -> FlowBackend:
+    '''FlowBackend by registry name; a FlowBackend instance is returned as is'''
+    if isinstance(backend, FlowBackend):
+        return backend
+    if backend not in DENSE_FLOW_BACKENDS:
+        raise ValueError(f'Unknown dense flow backend {backend!r}, available: {list(DENSE_FLOW_BACKENDS)}')
+    return DENSE_FLOW_BACKENDS[backend](preset, **kwargs)
@@ -0,0 +1,145 @@
+from functools import lru_cache
+from typing import Optional
+import cv2
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def disk_stamp(radius: int) -> np.ndarray:
+    '''(dx, dy) offsets of the pixels cv2.circle fills for a disk of this radius'''
+    size = 2 * radius + 1
+    canvas = np.zeros((size, size), dtype=np.uint8)
+    cv2.circle(canvas, (radius, radius), radius, 255, -1)
+    dy, dx = np.nonzero(canvas)
+    return np.stack([dx - radius, dy - radius], axis=1)
+
+
+def fit_color(color, channels: int) -> np.ndarray:
+    '''
+    Color(s) as cv2 drawing functions read them for an image with `channels` channels:
+    a scalar or tuple is padded with zeros and only its first `channels` components are used.
+    color: one color or an (N, components) array of colors, returned as (channels,) or (N, channels).
+    '''
+    color = np.asarray(color, dtype=np.float64)
+    per_point = color.ndim == 2
+    color = color.reshape(len(color) if per_point else 1, -1)
+    fitted = np.zeros((len(color), channels))
+    components = min(channels, color.shape[1])
+    fitted[:, :components] = color[:, :components]
+    return fitted if per_point else fitted[0]
+
+
+def stamp_points(image: np.ndarray, points: np.ndarray, radius: int, color) -> np.ndarray:
+    '''
+    Filled disks at integer (x, y) points, pixel-identical to cv2.circle(..., thickness=-1)
+    but drawn with a single fancy-indexed assignment instead of one call per point.
+    color: one color for all points or an (N, components) array of per-point colors, fitted to
+    the image channels like cv2.circle does (see fit_color); where disks overlap the later
+    point wins, as with consecutive cv2.circle calls.
+    '''
+    if len(points) == 0:
+        return image
+    offsets = disk_stamp(radius)
+    h, w = image.shape[:2]
+    xs = (points[:, 0, None] + offsets[None, :, 0]).ravel()
+    ys = (points[:, 1, None] + offsets[None, :, 1]).ravel()
+    inside = (xs >= 0) & (xs < w) & (ys >= 0) & (ys < h)
+    # Single channel images are drawn through an (h, w, 1) view
+    pixels = image[..., None] if image.ndim == 2 else image
+    color = np.rint(fit_color(color, pixels.shape[2])).astype(image.dtype)
+    if color.ndim == 2:
+        color = np.repeat(color, len(offsets), axis=0)[inside]
+    if pixels.flags.c_contiguous:
+        # Flat pixel indices are cheaper than a pair of index arrays
+        pixels.reshape(h * w, -1)[ys[inside] * w + xs[inside]] = color
+    else:
+        pixels[ys[inside], xs[inside]] = color
+    return image
+
+
+def draw_segments(image: np.ndarray, starts: np.ndarray, ends: np.ndarray, palette: np.ndarray, thickness=1) -> np.ndarray:
+    '''
+    Line segments between integer points, point i colored palette[i % len(palette)]:
+    one cv2.polylines call per palette color instead of one cv2.line per segment.
+    '''
+    lines = np.stack([starts, ends], axis=1).astype(np.int32)
+    for i, color in enumerate(palette[:len(lines)]):
+        cv2.polylines(image, lines[i::len(palette)], False, color.tolist(), thickness)
+    return image
+
+
+class FlowLinesRenderer:
+    '''
+    Dense flow as line segments sampled every `step` pixels, drawn with one cv2.polylines
+    call, with a dot stamped at each starting point.
+
+    offset: position of the first sample, step // 2 by default;
+    min_motion: only draw vectors moving more than this many pixels along x or y;
+    dot_color: color of the dots, the line color by default; a dot_radius of None skips them.
+    '''
+    def __init__(self, step=16, color=(0, 255, 0), dot_color=None, dot_radius: Optional[int] = 1,
+                 thickness=1, offset=None, min_motion: Optional[float] = None):
+        self.step = step
+        self.color = color
+        self.dot_color = color if dot_color is None else dot_color
+        self.dot_radius = dot_radius
+        self.thickness = thickness
+        self.offset = step // 2 if offset is None else offset
+        self.min_motion = min_motion
+        self._grid_shape = None
+        self._grid = None
+
+    def _sample_grid(self, h, w):
+        if self._grid_shape != (h, w):
+            y, x = np.mgrid[self.offset:h:self.step, self.offset:w:self.step].reshape(2, -1)
+            self._grid = (y, x, np.stack([x, y], axis=1).astype(np.int32))
+            self._grid_shape = (h, w)
+        return self._grid
+
+    def draw(self, image: np.ndarray, flow: np.ndarray) -> np.ndarray:
+        '''Draw on image (in place) and return it, flow must have the image size'''
+        y, x, starts = self._sample_grid(*flow.shape[:2])
+        vectors = flow[y, x]
+        if self.min_motion is not None:
+            moving = np.abs(vectors).max(axis=1) > self.min_motion
+            vectors, starts = vectors[moving], starts[moving]
+        ends = np.int32(starts + vectors + 0.5)
+        lines = np.stack([starts, ends], axis=1)
+        cv2.polylines(image, lines, False, self.color, self.thickness)
+        if self.dot_radius is not None:
+            stamp_points(image, starts, self.dot_radius, self.dot_color)
+        return image
+
+
+class FlowHSVRenderer:
+    '''
+    Dense flow as a color image: hue is the direction, value the magnitude normalized to the frame.
+    Intermediate buffers are allocated once per flow size and reused between frames.
+    '''
+    def __init__(self):
+        self._shape = None
+
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        self.flow_x = np.empty((h, w), dtype=np.float32)
+        self.flow_y = np.empty((h, w), dtype=np.float32)
+        self.magnitude = np.empty((h, w), dtype=np.float32)
+        self.angle = np.empty((h, w), dtype=np.float32)
+        self.hue = np.empty((h, w), dtype=np.uint8)
+        self.saturation = np.full((h, w), 255, dtype=np.uint8)
+        self.value = np.empty((h, w), dtype=np.uint8)
+        self.hsv = np.empty((h, w, 3), dtype=np.uint8)
+        self._shape = (h, w)
+
+    def render(self, flow: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        '''BGR visualization of flow, written to `out` when given, a new image otherwise'''
+        if self._shape != flow.shape[:2]:
+            self._allocate(flow.shape)
+        # Contiguous planes, cartToPolar on strided channel views is several times slower
+        cv2.split(flow, [self.flow_x, self.flow_y])
+        cv2.cartToPolar(self.flow_x, self.flow_y, magnitude=self.magnitude, angle=self.angle, angleInDegrees=True)
+        # OpenCV hue is degrees / 2 to fit 8 bits
+        cv2.convertScaleAbs(self.angle, dst=self.hue, alpha=0.5)
+        cv2.normalize(self.magnitude, self.value, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+        cv2.merge([self.hue, self.saturation, self.value], dst=self.hsv)
+        return cv2.cvtColor(self.hsv, cv2.COLOR_HSV2BGR, dst=out)
@@ -0,0 +1,48 @@
+import time
+from typing import Optional
+import numpy as np
+import cv2
+
+
+class FrameContext:
+    '''
+    One captured frame and the images derived from it, computed on first use and
+    shared by every processor that handles the frame (grayscale, Gaussian pyramid).
+    Processors accept either a FrameContext or a plain BGR/grayscale frame.
+    '''
+    def __init__(self, frame: np.ndarray, timestamp: Optional[float] = None):
+        self.frame = frame
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self._gray = None
+        self._pyramid = []
+
+    @classmethod
+    def of(cls, frame) -> 'FrameContext':
+        '''Wrap a plain frame; a FrameContext is returned as is.'''
+        return frame if isinstance(frame, FrameContext) else cls(frame)
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = self.frame if self.frame.ndim == 2 else cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def retain(self, image: np.ndarray) -> np.ndarray:
+        '''
+        image (derived from this frame) in a form safe to keep for the next frame: copied
+        only when it is a view of the captured frame itself (e.g. the gray image of a 2-D
+        frame), whose buffer an input may reuse (CropResize ring, memmap replay).
+        '''
+        return image.copy() if np.may_share_memory(image, self.frame) else image
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    def pyramid(self, level: int) -> np.ndarray:
+        '''Grayscale image downscaled `level` times by cv2.pyrDown (level 0 is the gray frame).'''
+        if not self._pyramid:
+            self._pyramid.append(self.gray)
+        while len(self._pyramid) <= level:
+            self._pyramid.append(cv2.pyrDown(self._pyramid[-1]))
+        return self._pyramid[level]
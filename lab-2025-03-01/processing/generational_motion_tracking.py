@@ -1,4 +1,4 @@
-from typing import Callable, List
+from typing import Callable, Dict, List
 import numpy as np
 
 from processing.optical_flow import SparseResult
@@ -6,56 +6,56 @@ from processing.base_tracking import BaseInference, BaseSparseInference
 
 
 class GenerationalVectorInference(BaseInference):
+    '''
+    One sparse tracker per live generation, keyed by `SparseResult.generation`.
+    Trackers of generations missing from the results have fizzled and are dropped.
+    '''
     def __init__(self, TrackerInstantiator: Callable[[np.ndarray], BaseSparseInference]) -> None:
         self.TrackerInstantiator = TrackerInstantiator
-        self.trackers: List[BaseSparseInference | None] = []
-        self.active_trackers = 0
+        self.trackers: Dict[int, BaseSparseInference] = {}
+        self.generations_seen = 0
         self.fizzled_trackers = 0
         self.average_motion_vector = np.array([0.0, 0.0])
         self.initial_motion_vector = np.array([0.0, 0.0])
 
-    def _synchronize_trackers_with_results(self, results: List[SparseResult | None]):
-        for i, result in enumerate(results):
-            # No result means process is not active anymore and its tracker should be removed
-            if result is None:
-                tracker_to_remove = self.trackers[i]
-                if tracker_to_remove is not None:
-                    self.trackers[i] = None
-                    del tracker_to_remove
-                    self.active_trackers -= 1
-                    self.fizzled_trackers += 1
-                continue
-            # Instantiate new tracker for new results
-            if len(self.trackers) <= i:
-                new_tracker = self.TrackerInstantiator(self.average_motion_vector)
-                self.trackers.append(new_tracker)
-                self.active_trackers += 1
+    @property
+    def active_trackers(self):
+        return len(self.trackers)
 
-    def infer(self, results: List[SparseResult | None]):
+    def _synchronize_trackers_with_results(self, results: List[SparseResult]):
+        live_generations = {result.generation for result in results}
+        # Generation missing from the results means its points are lost and its tracker should be removed
+        for generation in [generation for generation in self.trackers if generation not in live_generations]:
+            del self.trackers[generation]
+            self.fizzled_trackers += 1
+        # Instantiate new tracker for new generations
+        for result in results:
+            if result.generation not in self.trackers:
+                self.trackers[result.generation] = self.TrackerInstantiator(self.average_motion_vector)
+                self.generations_seen += 1
+
+    def infer(self, results: List[SparseResult]):
         self._synchronize_trackers_with_results(results)
-        
+
         subvector_results = []
         compound_motion_vector_results = []
-        for i, result in enumerate(results):
-            if result is None: # Tracker and its OF process are not active anymore
-                subvector_results.append(None)
-                continue
-            tracker: BaseSparseInference = self.trackers[i]
+        for result in results:
+            tracker: BaseSparseInference = self.trackers[result.generation]
             # One-generation tracker returns motion vector and initial vector
             result_vectors = tracker.infer(result)
             subvector_results.append(result_vectors)
             compound_motion_vector = result_vectors[0] + result_vectors[1]
             compound_motion_vector_results.append(compound_motion_vector)
 
-        average_motion_vector = np.mean(np.array(compound_motion_vector_results), axis=0)
-        self.average_motion_vector = average_motion_vector
+        if compound_motion_vector_results:
+            self.average_motion_vector = np.mean(np.array(compound_motion_vector_results), axis=0)
         return {
-            'average_motion_vector': average_motion_vector,
+            'average_motion_vector': self.average_motion_vector,
             'subvector_results': subvector_results
         }
     
     def get_title_message(self):
-        return f'GEN {len(self.trackers)}'
+        return f'GEN {self.generations_seen}'
     
     def get_parameter_message(self):
         return f'''ACTIVE: {self.active_trackers}
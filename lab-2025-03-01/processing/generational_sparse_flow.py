@@ -1,23 +1,54 @@
 from typing import List
 import cv2
+import numpy as np
 
-from processing.optical_flow import IOpticalFlow, LucasKanadeOpticalFlow, SparseResult
+from processing.feature_grid import FeatureGrid
+from processing.frame_context import FrameContext
+from processing.optical_flow import IOpticalFlow, LucasKanadeOpticalFlow, SparseResult, filter_tracks
+from processing.point_store import PointStore, split_by_generation
 
 
 class GenerationalLKFlow(IOpticalFlow):
-    def __init__(self, OpticalFlowClass, max_frame_interval=600, max_active_generations=3):
-        self.OpticalFlowClass = OpticalFlowClass
-        self.flow_processors: List[LucasKanadeOpticalFlow | None] = []
+    '''
+    Lucas-Kanade tracking of several generations of feature points. A new generation
+    is detected every `max_frame_interval` frames and the oldest one is dropped when more
+    than `max_active_generations` are alive. Points of all generations live in one
+    PointStore and are tracked with a single calcOpticalFlowPyrLK call per frame.
+
+    apply() returns one SparseResult per live generation (ordered by generation id,
+    `SparseResult.generation` identifies it); fizzled generations are simply absent.
+
+    With a `feature_grid`, sparse regions are refilled every frame and the new corners
+    join the newest live generation, keeping the density stable between generations.
+    fb_threshold, err_percentile: optional outlier rejection, see filter_tracks.
+    '''
+    def __init__(self, feature_params=None, lk_params=None, max_frame_interval=600, max_active_generations=3,
+                 feature_grid: FeatureGrid | None = None, fb_threshold: float | None = None,
+                 err_percentile: float | None = None):
+        # Defaults of LucasKanadeOpticalFlow
+        defaults = LucasKanadeOpticalFlow()
+        self.feature_params = defaults.feature_params if feature_params is None else feature_params
+        self.lk_params = defaults.lk_params if lk_params is None else lk_params
+        self.store = PointStore()
+        self.old_gray = None
         self.starting_frames = []
         self.frame_count = 0
         self.max_frame_interval = max_frame_interval
         self.max_active_generations = max_active_generations
+        self.feature_grid = feature_grid
+        self.fb_threshold = fb_threshold
+        self.err_percentile = err_percentile
         return super().__init__()
 
+    @property
+    def generations_created(self):
+        return len(self.starting_frames)
+
     def set1stFrame(self, frame):
-        self.first_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        context = FrameContext.of(frame)
+        self.first_frame = context.retain(context.gray)
 
-    def _is_new_processor_to_instantiate(self):
+    def _is_new_generation_to_instantiate(self):
         try:
             latest_instantiation_frame = self.starting_frames[-1]
             if self.frame_count - latest_instantiation_frame > self.max_frame_interval:
@@ -26,38 +57,95 @@ class GenerationalLKFlow(IOpticalFlow):
             return True
         return False
 
-    def _instantiate_new_processor(self):
-        new_processor: LucasKanadeOpticalFlow = self.OpticalFlowClass()
-        self.flow_processors.append(new_processor)
+    def _instantiate_new_generation(self, frame_gray):
+        '''Detect features of a new generation on frame_gray, returns its id and points'''
+        generation = self.generations_created
         self.starting_frames.append(self.frame_count)
-        active_processors_count = len(list(filter(lambda x: x is not None, self.flow_processors)))
-        if active_processors_count > self.max_active_generations:
-            for i, processor in enumerate(self.flow_processors):
-                if processor is None:
-                    continue
-                self._destroy_processor(i)
-                break
-
-    def _destroy_processor(self, i):
-        processor_to_release = self.flow_processors[i]
-        self.flow_processors[i] = None
-        del processor_to_release
+        points = cv2.goodFeaturesToTrack(frame_gray, mask=None, **self.feature_params)
+        if points is None:
+            points = np.empty((0, 2), dtype=np.float32)
+        self.store.add(points, generation)
+
+        live_generations = self.store.live_generations()
+        for oldest in live_generations[:max(0, len(live_generations) - self.max_active_generations)]:
+            self.store.kill_generation(oldest)
+        return generation, points.reshape(-1, 2).astype(np.float32)
 
     def apply(self, frame):
-        if self._is_new_processor_to_instantiate():
-            self._instantiate_new_processor()
-
-        results: List[SparseResult | None] = []
-        for i, processor in enumerate(self.flow_processors):
-            try:
-                if processor is None:
-                    results.append(None)
-                    continue
-                _, sparse_result = processor.apply(frame)
-                results.append(sparse_result)
-            except cv2.error:
-                results.append(None)
-                self._destroy_processor(i)
+        '''frame: BGR image or FrameContext (its grayscale image is shared with other processors)'''
+        context = FrameContext.of(frame)
+        frame_gray = context.gray
+        new_generation = None
+        if self._is_new_generation_to_instantiate():
+            new_generation = self._instantiate_new_generation(frame_gray)
+
+        results: List[SparseResult] = []
+        indices = self.store.live_indices()
+        if new_generation is not None:
+            # The new generation was just detected on this frame, there is nothing to track yet
+            indices = indices[self.store.generations[indices] != new_generation[0]]
+        if self.old_gray is not None and len(indices):
+            results = self._track(frame_gray, indices)
+        if new_generation is not None and len(new_generation[1]):
+            generation, points = new_generation
+            results.append(self._make_result(frame_gray, points, points, np.ones((len(points), 1), np.uint8),
+                                             generation, np.ones(len(points), np.float32)))
+        elif self.feature_grid is not None:
+            self._replenish(frame_gray)
 
+        self.store.maybe_compact()
+        self.old_gray = context.retain(frame_gray)
         self.frame_count += 1
-        return frame, results
+        return context.frame, results
+
+    def _replenish(self, frame_gray):
+        '''Add corners in sparse cells to the newest live generation, they are tracked from the next frame'''
+        indices = self.store.live_indices()
+        if len(indices) == 0:
+            return
+        new_points = self.feature_grid.replenish(frame_gray, self.store.points[indices])
+        if len(new_points):
+            # Appending to the newest generation keeps live points ordered by generation
+            self.store.add(new_points, int(self.store.generations[indices[-1]]))
+
+    def _track(self, frame_gray, indices) -> List[SparseResult]:
+        old_points = self.store.points[indices]
+        try:
+            new_points, st, err = cv2.calcOpticalFlowPyrLK(self.old_gray, frame_gray,
+                                                           old_points.reshape(-1, 1, 2), None, **self.lk_params)
+        except cv2.error:
+            self.store.kill(indices)
+            return []
+        st, quality = filter_tracks(self.old_gray, frame_gray, old_points.reshape(-1, 1, 2), new_points, st, err,
+                                    self.lk_params, self.fb_threshold, self.err_percentile)
+        new_points = new_points.reshape(-1, 2)
+        found = st.ravel() == 1
+        self.store.points[indices[found]] = new_points[found]
+        self.store.kill(indices[~found])
+
+        results = []
+        for generation, start, end in split_by_generation(self.store.generations[indices]):
+            generation_found = found[start:end]
+            if not generation_found.any():
+                continue
+            results.append(self._make_result(frame_gray,
+                                             old_points[start:end][generation_found],
+                                             new_points[start:end][generation_found],
+                                             st[start:end], generation,
+                                             quality[start:end][generation_found]))
+        return results
+
+    def _make_result(self, frame_gray, good_old, good_new, st, generation, quality) -> SparseResult:
+        # Pixels are calculated from top left corner of the image,
+        # points are calculated from the center of the image.
+        centerpoint = np.array([frame_gray.shape[1] // 2, frame_gray.shape[0] // 2])
+        return SparseResult(
+            old_pixels = good_old,
+            new_pixels = good_new,
+            old_points = good_old - centerpoint,
+            new_points = good_new - centerpoint,
+            original_points = good_new.reshape(-1, 1, 2),
+            valid_positions = st,
+            generation = generation,
+            quality = quality,
+        )
@@ -2,6 +2,11 @@ from dataclasses import dataclass
 import numpy as np
 import cv2
 
+from processing.feature_grid import FeatureGrid
+from processing.flow_backends import FlowBackend, create_flow_backend
+from processing.flow_render import FlowHSVRenderer, FlowLinesRenderer
+from processing.frame_context import FrameContext
+
 
 @dataclass
 class SparseResult:
@@ -11,6 +16,37 @@ class SparseResult:
     new_points: np.ndarray
     original_points: np.ndarray
     valid_positions: np.ndarray
+    generation: int = 0
+    # Per-point track quality in (0, 1], aligned with new_pixels (see filter_tracks)
+    quality: np.ndarray | None = None
+
+
+def filter_tracks(prev_gray, next_gray, p0, p1, st, err, lk_params,
+                  fb_threshold: float | None = None, err_percentile: float | None = None):
+    '''
+    Reject unreliable calcOpticalFlowPyrLK tracks (p0 -> p1 with status st and error err).
+
+    fb_threshold: track the found points back to prev_gray and drop those that do not
+        return within this many pixels of where they started (forward-backward check);
+    err_percentile: drop points whose LK error is above this percentile of the found ones.
+
+    Returns the new status (N, 1) uint8 and a per-point quality 1 / (1 + e) for all N points,
+    where e is the forward-backward distance in pixels when the check is enabled and the LK
+    error otherwise.
+    '''
+    found = st.ravel() == 1
+    err = err.ravel()
+    score = err.astype(np.float32)
+    if fb_threshold is not None and found.any():
+        indices = np.flatnonzero(found)
+        back, st_back, _ = cv2.calcOpticalFlowPyrLK(next_gray, prev_gray, p1[indices], None, **lk_params)
+        fb_error = np.linalg.norm((back - p0[indices]).reshape(-1, 2), axis=1)
+        found[indices] = (st_back.ravel() == 1) & (fb_error <= fb_threshold)
+        score[indices] = fb_error
+    if err_percentile is not None and found.any():
+        found &= err <= np.percentile(err[found], err_percentile)
+    quality = 1.0 / (1.0 + score)
+    return found.astype(np.uint8).reshape(-1, 1), quality
 
 
 class IOpticalFlow:
@@ -26,27 +62,99 @@ class IOpticalFlow:
         return result, None
 
 class DenseOpticalFlow(IOpticalFlow):
-    '''Abstract class for DenseOpticalFlow expressions'''
-    def __init__(self):
+    '''
+    Abstract class for DenseOpticalFlow expressions.
+
+    backend: name from DENSE_FLOW_BACKENDS (farneback, dis, tvl1 with opencv-contrib) or a FlowBackend;
+    preset: parameter preset of the backend, its default one if not given; single Farneback
+        values can be overridden by `params`;
+    scale: compute the flow on the frame downscaled by this factor in (0, 1] (powers of 1/2 reuse the
+        FrameContext pyramid shared with other processors);
+    roi: (x, y, width, height) of the frame to compute the flow on, the whole frame by default;
+    upsample: resize the flow back to the frame (ROI) resolution, otherwise apply() returns it at
+        the computed resolution; its vectors are in frame pixels either way. makeResult always gets
+        a grayscale image and a flow of the same size, in that image's pixels (the downscaled
+        image and the computed flow when not upsampled);
+    warm_start: start each estimate from the previous flow instead of zero, consecutive frames
+        move alike; warm_levels and warm_iterations (Farneback only) reduce the pyramid levels
+        and iterations used when warm-started.
+    '''
+    def __init__(self, preset=None, scale=1.0, roi=None, upsample=True, params=None,
+                 backend: str | FlowBackend = 'farneback', warm_start=False, warm_levels=None, warm_iterations=None):
+        backend_kwargs = {}
+        if params is not None:
+            backend_kwargs['params'] = params
+        if warm_levels is not None:
+            backend_kwargs['warm_levels'] = warm_levels
+        if warm_iterations is not None:
+            backend_kwargs['warm_iterations'] = warm_iterations
+        if not 0 < scale <= 1:
+            raise ValueError(f'Dense flow scale must be in (0, 1], got {scale}')
+        self.backend = create_flow_backend(backend, preset, **backend_kwargs)
+        self.warm_start = warm_start
+        self.prev_flow = None
+        self.scale = scale
+        self.roi = roi
+        self.upsample = upsample
         self.prev = None
         return super().__init__()
 
     def set1stFrame(self, frame):
-        self.prev = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        self.hsv = np.zeros_like(frame)
-        self.hsv[..., 1] = 255
+        context = FrameContext.of(frame)
+        prev, _ = self._prepare(context)
+        self.prev = context.retain(prev)
+        self.prev_flow = None
+
+    def _prepare(self, context: FrameContext):
+        '''Grayscale image to compute the flow on and the frame (ROI) it stands for'''
+        gray = context.gray
+        x, y, w, h = (0, 0, gray.shape[1], gray.shape[0]) if self.roi is None else self.roi
+        full = gray[y:y + h, x:x + w]
+        if self.scale == 1:
+            return full, full
+        level = np.log2(1 / self.scale)
+        if self.roi is None and level == int(level):
+            return context.pyramid(int(level)), full
+        size = (max(1, round(full.shape[1] * self.scale)), max(1, round(full.shape[0] * self.scale)))
+        return cv2.resize(full, size, interpolation=cv2.INTER_AREA), full
+
+    def _calc(self, prev, next):
+        '''Flow from prev to next at their resolution, in their pixels'''
+        if not self.warm_start:
+            return self.backend.calc(prev, next)
+        if self.prev_flow is not None and self.prev_flow.shape[:2] != next.shape[:2]:
+            self.prev_flow = None
+        self.prev_flow = self.backend.calc(prev, next, self.prev_flow)
+        return self.prev_flow
+
+    def _to_frame_pixels(self, flow, full_shape):
+        h, w = full_shape[:2]
+        flow_h, flow_w = flow.shape[:2]
+        if (flow_h, flow_w) == (h, w):
+            return flow
+        factor = np.array([w / flow_w, h / flow_h], dtype=np.float32)
+        if not self.upsample:
+            # New array, the computed flow may be kept as the next initial estimate
+            return flow * factor
+        flow = cv2.resize(flow, (w, h), interpolation=cv2.INTER_LINEAR)
+        flow *= factor
+        return flow
 
     def apply(self, frame):
+        '''frame: BGR image or FrameContext (its grayscale image is shared with other processors)'''
+        context = FrameContext.of(frame)
         if self.prev is None:
-            self.set1stFrame(frame)
+            self.set1stFrame(context)
 
-        next = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        next, full = self._prepare(context)
+        grid_flow = self._calc(self.prev, next)
+        flow = self._to_frame_pixels(grid_flow, full.shape)
 
-        flow = cv2.calcOpticalFlowFarneback(self.prev, next, None,
-                                            0.5, 3, 15, 3, 5, 1.2, 0)
-
-        result = self.makeResult(next, flow)
-        self.prev = next
+        if self.upsample:
+            result = self.makeResult(full, flow)
+        else:
+            result = self.makeResult(next, grid_flow)
+        self.prev = context.retain(next)
         return result, flow
 
     def makeResult(self, grayFrame, flow):
@@ -54,28 +162,22 @@ class DenseOpticalFlow(IOpticalFlow):
         return grayFrame.copy()
 
 class DenseOpticalFlowByHSV(DenseOpticalFlow):
+    def __init__(self, **kwargs):
+        self.renderer = FlowHSVRenderer()
+        return super().__init__(**kwargs)
+
     def makeResult(self, grayFrame, flow):
-        mag, ang = cv2.cartToPolar(flow[...,0], flow[...,1])
-        self.hsv[...,0] = ang*180/np.pi/2
-        self. hsv[...,2] = cv2.normalize(mag, None, 0, 255, cv2.NORM_MINMAX)
-        return cv2.cvtColor(self.hsv, cv2.COLOR_HSV2BGR)
+        return self.renderer.render(flow)
 
 class DenseOpticalFlowByLines(DenseOpticalFlow):
-    def __init__(self):
-        self.step = 64 # configure this if you need other steps...
-        return super().__init__()
+    def __init__(self, step=64, **kwargs):
+        self.step = step # configure this if you need other steps...
+        self.renderer = FlowLinesRenderer(step=step)
+        return super().__init__(**kwargs)
 
     def makeResult(self, grayFrame, flow):
-        h, w = grayFrame.shape[:2]
-        y, x = np.mgrid[self.step//2:h:self.step, self.step//2:w:self.step].reshape(2,-1)
-        fx, fy = flow[y,x].T
-        lines = np.vstack([x, y, x+fx, y+fy]).T.reshape(-1, 2, 2)
-        lines = np.int32(lines + 0.5)
         vis = cv2.cvtColor(grayFrame, cv2.COLOR_GRAY2BGR)
-        cv2.polylines(vis, lines, 0, (0, 255, 0))
-        for (x1, y1), (x2, y2) in lines:
-            cv2.circle(vis, (x1, y1), 1, (0, 255, 0), -1)
-        return vis
+        return self.renderer.draw(vis, flow)
 
 class DenseOpticalFlowByWarp(DenseOpticalFlow):
     def makeResult(self, grayFrame, flow):
@@ -86,7 +188,16 @@ class DenseOpticalFlowByWarp(DenseOpticalFlow):
         return cv2.remap(grayFrame, flow, None, cv2.INTER_LINEAR)
 
 class LucasKanadeOpticalFlow(IOpticalFlow):
-    def __init__(self, feature_params=None, lk_params=None):
+    '''
+    feature_grid: optional FeatureGrid; when given, sparse regions of each new frame are
+    refilled with fresh corners so the point set does not decay. Replenished points are
+    tracked from the next frame on, which makes the point count vary between frames
+    (StaticVectorInferenceSparse expects a fixed starting set and should not be used with it).
+
+    fb_threshold, err_percentile: optional outlier rejection, see filter_tracks.
+    '''
+    def __init__(self, feature_params=None, lk_params=None, feature_grid: FeatureGrid | None = None,
+                 fb_threshold: float | None = None, err_percentile: float | None = None):
         # params for ShiTomasi corner detection
         if feature_params is None:
             feature_params = dict( maxCorners = 100,
@@ -101,35 +212,49 @@ class LucasKanadeOpticalFlow(IOpticalFlow):
                                criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
         self.feature_params = feature_params
         self.lk_params = lk_params
+        self.feature_grid = feature_grid
+        self.fb_threshold = fb_threshold
+        self.err_percentile = err_percentile
 
         self.p0 = None
         self.old_gray = None
         return super().__init__()
 
     def set1stFrame(self, frame):
-        self.old_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        context = FrameContext.of(frame)
+        self.old_gray = context.retain(context.gray)
         self.p0 = cv2.goodFeaturesToTrack(self.old_gray, mask = None, **self.feature_params)
 
     def apply(self, frame):
+        '''frame: BGR image or FrameContext (its grayscale image is shared with other processors)'''
+        context = FrameContext.of(frame)
         if self.p0 is None:
-            self.set1stFrame(frame)
+            self.set1stFrame(context)
 
-        frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        frame_gray = context.gray
 
         # calculate optical flow
         p1, st, err = cv2.calcOpticalFlowPyrLK(self.old_gray, frame_gray,
                                                self.p0, None, **self.lk_params)
+        st, quality = filter_tracks(self.old_gray, frame_gray, self.p0, p1, st, err, self.lk_params,
+                                    self.fb_threshold, self.err_percentile)
+        return context.frame, self.advance(context.retain(frame_gray), p1, st, quality)
 
+    def advance(self, frame_gray, p1, st, quality=None):
+        '''Build the SparseResult from tracked points p1/status st and move on to frame_gray'''
         # Select good points
         good_new = p1[st==1]
         good_old = self.p0[st==1]
+        if quality is not None:
+            quality = quality[st.ravel()==1]
 
         centerpoint = np.array([frame_gray.shape[1] // 2, frame_gray.shape[0] // 2])
         old_points = good_old - centerpoint
         new_points = good_new - centerpoint
 
-        # Update the previous frame and previous points
-        self.old_gray = frame_gray.copy()
+        # Update the previous frame and previous points; the shared grayscale image is
+        # never modified in place, apply() only copies it when it aliases the input frame
+        self.old_gray = frame_gray
         self.p0 = good_new.reshape(-1, 1, 2)
 
         # Pixels are calculated from top left corner of the image,
@@ -141,19 +266,21 @@ class LucasKanadeOpticalFlow(IOpticalFlow):
             new_points = new_points,
             original_points = self.p0,
             valid_positions = st,
-
+            quality = quality,
         )
-        return frame, sparse_result
+        if self.feature_grid is not None:
+            self.p0 = np.concatenate([self.p0, self.feature_grid.replenish(frame_gray, self.p0)])
+        return sparse_result
 
 
-def CreateOpticalFlow(type):
-    '''Optical flow showcase factory, call by type as shown below'''
+def CreateOpticalFlow(type, backend='farneback', preset=None):
+    '''Optical flow showcase factory, call by type as shown below; backend/preset apply to dense types'''
     def dense_by_hsv():
-        return DenseOpticalFlowByHSV()
+        return DenseOpticalFlowByHSV(backend=backend, preset=preset)
     def dense_by_lines():
-        return DenseOpticalFlowByLines()
+        return DenseOpticalFlowByLines(backend=backend, preset=preset)
     def dense_by_warp():
-        return DenseOpticalFlowByWarp()
+        return DenseOpticalFlowByWarp(backend=backend, preset=preset)
     def lucas_kanade():
         return LucasKanadeOpticalFlow()
     return {
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class PointStore:
+    '''
+    Tracked points of all generations in contiguous arrays (struct of arrays):
+    positions, generation ids and an alive mask. Lost points are only masked out;
+    the arrays are compacted once dead entries outnumber the live ones, so the cost
+    of a frame is proportional to the live points, not to every generation ever created.
+    Points are appended generation by generation and compaction keeps their order,
+    so the live points of one generation always form a contiguous run.
+    '''
+    def __init__(self, capacity: int = 256, min_compaction: int = 64):
+        self.points = np.empty((capacity, 2), dtype=np.float32)
+        self.generations = np.empty(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.size = 0
+        self.live_count = 0
+        self.min_compaction = min_compaction
+
+    def __len__(self):
+        return self.live_count
+
+    def add(self, points: np.ndarray, generation: int) -> np.ndarray:
+        '''Append points of a generation, returns their indices'''
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        self._reserve(self.size + len(points))
+        indices = np.arange(self.size, self.size + len(points))
+        self.points[indices] = points
+        self.generations[indices] = generation
+        self.alive[indices] = True
+        self.size += len(points)
+        self.live_count += len(points)
+        return indices
+
+    def live_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self.size])
+
+    def kill(self, indices: np.ndarray):
+        indices = indices[self.alive[indices]]
+        self.alive[indices] = False
+        self.live_count -= len(indices)
+
+    def kill_generation(self, generation: int):
+        indices = self.live_indices()
+        self.kill(indices[self.generations[indices] == generation])
+
+    def live_generations(self) -> np.ndarray:
+        '''Ids of the generations with live points, ascending'''
+        return np.unique(self.generations[self.live_indices()])
+
+    def maybe_compact(self):
+        '''Drop dead entries once they outnumber the live ones'''
+        dead = self.size - self.live_count
+        if dead > max(self.live_count, self.min_compaction):
+            self.compact()
+
+    def compact(self):
+        indices = self.live_indices()
+        count = len(indices)
+        self.points[:count] = self.points[indices]
+        self.generations[:count] = self.generations[indices]
+        self.alive[:count] = True
+        self.alive[count:self.size] = False
+        self.size = count
+
+    def _reserve(self, size: int):
+        if size <= len(self.points):
+            return
+        capacity = max(size, 2 * len(self.points))
+        self.points = np.resize(self.points, (capacity, 2))
+        self.generations = np.resize(self.generations, capacity)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.size] = self.alive[:self.size]
+        self.alive = alive
+
+
+def split_by_generation(generations: np.ndarray) -> list:
+    '''(generation, start, end) runs of a generation id array ordered by generation'''
+    if len(generations) == 0:
+        return []
+    bounds = np.flatnonzero(np.diff(generations)) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(generations)]))
+    return [(int(generations[start]), int(start), int(end)) for start, end in zip(starts, ends)]
@@ -30,7 +30,8 @@ Hit ESC to exit.
 @click.option('--path', required=False, type=str, help='Path to the input video file or photo folder')
 @click.option('--crop', required=False, type=float, help='Percent of HFOV to retain, 100 percent by default')
 @click.option('--maxwidth', required=False, type=int, help='Downsample to maximum width in pixels, no resize by default')
-def main(path: Optional[str], crop: Optional[float], maxwidth: Optional[int]):
+@click.option('--prefetch', required=False, type=int, default=0, help='Frames to decode ahead in a background thread, 0 disables')
+def main(path: Optional[str], crop: Optional[float], maxwidth: Optional[int], prefetch: int):
 
     original_cwd = os.getcwd()
 
@@ -41,7 +42,7 @@ def main(path: Optional[str], crop: Optional[float], maxwidth: Optional[int]):
     file_name_without_extension = os.path.splitext(base_name)[0]
     video_writer = MP4VideoWriter(file_name_without_extension)
 
-    image_input = get_video_input(path, crop=crop, maxwidth=maxwidth)
+    image_input = get_video_input(path, crop=crop, maxwidth=maxwidth, prefetch=prefetch)
 
     processor = stitch_processor.StitchProcessor()
     map_visuzalizer = LocalMapHUD()
@@ -51,6 +52,8 @@ def main(path: Optional[str], crop: Optional[float], maxwidth: Optional[int]):
 
     while image_input.is_finished is False:
         frame = image_input.capture()
+        if frame is None:
+            break
 
         visuzalizer.setImage(np.copy(frame))
         processor_trails = processor.apply(frame)
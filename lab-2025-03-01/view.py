@@ -12,6 +12,7 @@ import cv2
 
 from acquisition.video_input import get_video_input
 from processing import optical_flow
+from processing.flow_backends import DENSE_FLOW_BACKENDS
 
 usage_text = '''
 Hit followings to switch to:
@@ -27,7 +28,7 @@ Hit 'f' to flip image horizontally.
 Hit ESC to exit.
 '''
 
-def reset_processor(key, previous_frame):
+def reset_processor(key, previous_frame, backend='farneback', preset=None):
     message, type = {
         ord('1'): ('==> Dense_by_hsv', 'dense_hsv'),
         ord('2'): ('==> Dense_by_lines', 'dense_lines'),
@@ -35,7 +36,7 @@ def reset_processor(key, previous_frame):
         ord('4'): ('==> Lucas-Kanade', 'lucas_kanade')
     }.get(key, ('==> Dense_by_hsv', 'dense_hsv'))
     print(message)
-    of_processor = optical_flow.CreateOpticalFlow(type)
+    of_processor = optical_flow.CreateOpticalFlow(type, backend=backend, preset=preset)
     of_processor.set1stFrame(previous_frame)
     return of_processor
 
@@ -44,7 +45,9 @@ def reset_processor(key, previous_frame):
 @click.option('--step', required=False, type=float, help='Interval between captured frames in seconds, each frame if not specified')
 @click.option('--crop', required=False, type=float, help='Percent of HFOV to retain, 100 percent by default')
 @click.option('--maxwidth', required=False, type=int, help='Downsample to maximum width in pixels, no resize by default')
-def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[int], step: Optional[float]):
+@click.option('--backend', required=False, type=click.Choice(list(DENSE_FLOW_BACKENDS)), default='farneback', help='Dense optical flow algorithm')
+@click.option('--preset', required=False, type=str, help='Preset of the dense flow backend (farneback: fast/balanced/quality, dis: ultrafast/fast/medium)')
+def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[int], step: Optional[float], backend: str, preset: Optional[str]):
     flipImage = True
     camera = get_video_input(image_path, crop=crop, maxwidth=maxwidth)
     cv2.namedWindow('preview')
@@ -56,7 +59,7 @@ def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[in
         # frame = np.array(array.get_data(), dtype=np.uint8).reshape((array.height, array.width, 3))
 
         if processor is None:
-            processor = reset_processor(ord('1'), frame)
+            processor = reset_processor(ord('1'), frame, backend, preset)
 
         ### flip
         if flipImage:
@@ -79,7 +82,7 @@ def main(image_path: Optional[str], crop: Optional[float], maxwidth: Optional[in
             flipImage = not flipImage
             print("Flip image: " + {True: "ON", False: "OFF"}.get(flipImage))
         elif ord('1') <= key <= ord('4'):
-            processor = reset_processor(key, frame)
+            processor = reset_processor(key, frame, backend, preset)
 
     ## finish
     camera.destroy()
@@ -5,6 +5,11 @@
 Використання:
     python leaderboard_runner.py --models-dir ./submissions/ --output results.csv
 
+Рядки CSV дописуються одразу після оцінки кожного студента, після завершення файл
+перезаписується відсортованою таблицею з рангами. Без дисплея (або з --no-show)
+графік рендериться через Agg без plt.show(); великі групи розбиваються на сторінки
+по --per-page студентів (leaderboard_01.png, leaderboard_02.png, ...).
+
 Структура директорії submissions/:
     submissions/
         student_name_1/
@@ -16,12 +21,14 @@
 """
 
 import argparse
+import csv
 import json
+import math
 import os
+import sys
 from pathlib import Path
 
 import gymnasium as gym
-import matplotlib.pyplot as plt
 import numpy as np
 
 # Перевірка наявності SB3 перед використанням
@@ -96,8 +103,33 @@ def load_submissions(models_dir: str) -> list[dict]:
     return submissions
 
 
-def run_leaderboard(models_dir: str, n_episodes: int = 100) -> list[dict]:
-    """Запустити оцінку всіх студентів."""
+CSV_FIELDS = [
+    "rank", "name", "A", "standard_mean", "standard_std",
+    "individual_mean", "individual_std",
+    "gravity", "wind", "wind_power", "turbulence",
+]
+
+
+class StreamingCSVWriter:
+    """Дописує рядки результатів у CSV одразу, щойно вони з'являються (без рангу)."""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self._file = open(output_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=CSV_FIELDS)
+        self._writer.writeheader()
+        self._file.flush()
+
+    def write(self, result: dict):
+        self._writer.writerow({k: result.get(k, "") for k in CSV_FIELDS})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run_leaderboard(models_dir: str, n_episodes: int = 100, on_result=None) -> list[dict]:
+    """Запустити оцінку всіх студентів. on_result(result) викликається для кожного результату."""
     submissions = load_submissions(models_dir)
 
     if not submissions:
@@ -141,78 +173,70 @@ def run_leaderboard(models_dir: str, n_episodes: int = 100) -> list[dict]:
             "wind_power": ind_params["wind_power"],
             "turbulence": ind_params["turbulence_power"],
         })
+        if on_result is not None:
+            on_result(results[-1])
 
     return results
 
 
-def save_csv(results: list[dict], output_path: str):
-    """Зберегти результати в CSV."""
-    import csv
+def _sort_key(result: dict) -> float:
+    return result["standard_mean"] if not np.isnan(result["standard_mean"]) else -1e6
+
 
-    fieldnames = [
-        "rank", "name", "A", "standard_mean", "standard_std",
-        "individual_mean", "individual_std",
-        "gravity", "wind", "wind_power", "turbulence",
-    ]
+def rank_results(results: list[dict]) -> list[dict]:
+    """Відсортувати за стандартною винагородою (найкращі зверху) і проставити rank — один раз для всіх виводів."""
+    ranked = sorted(results, key=_sort_key, reverse=True)
+    for rank, r in enumerate(ranked, 1):
+        r["rank"] = rank
+    return ranked
 
-    # Сортування за стандартною винагородою (найкращі зверху)
-    sorted_results = sorted(results, key=lambda x: x["standard_mean"]
-                            if not np.isnan(x["standard_mean"]) else -1e6, reverse=True)
 
-    with open(output_path, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+def save_csv(ranked: list[dict], output_path: str):
+    """Зберегти відсортовані результати (rank_results) в CSV, атомарно замінюючи файл."""
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
         writer.writeheader()
-        for rank, r in enumerate(sorted_results, 1):
-            r["rank"] = rank
-            writer.writerow({k: r.get(k, "") for k in fieldnames})
+        for r in ranked:
+            writer.writerow({k: r.get(k, "") for k in CSV_FIELDS})
+    os.replace(tmp_path, output_path)
 
     print(f"\nCSV збережено: {output_path}")
 
 
-def plot_leaderboard(results: list[dict], output_path: str = "leaderboard.png"):
-    """Побудувати візуальну турнірну таблицю."""
-    # Сортування за стандартною винагородою
-    sorted_results = sorted(results, key=lambda x: x["standard_mean"]
-                            if not np.isnan(x["standard_mean"]) else -1e6, reverse=True)
+def has_display() -> bool:
+    return sys.platform in ("win32", "darwin") or bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
 
-    names = [r["name"] for r in sorted_results]
-    standard_means = [r["standard_mean"] for r in sorted_results]
-    standard_stds = [r["standard_std"] for r in sorted_results]
-    individual_means = [r["individual_mean"] for r in sorted_results]
-    has_wind = [r["wind"] for r in sorted_results]
 
-    fig, ax = plt.subplots(figsize=(12, max(6, len(names) * 0.5)))
+def _draw_page(ax, page: list[dict]):
+    """Намалювати одну сторінку турнірної таблиці на осях ax."""
+    names = [r["name"] for r in page]
+    standard_means = np.array([r["standard_mean"] for r in page], dtype=float)
+    standard_stds = np.array([r["standard_std"] for r in page], dtype=float)
+    individual_means = np.array([r["individual_mean"] for r in page], dtype=float)
 
     y_pos = np.arange(len(names))
     bar_height = 0.35
 
-    # Стандартне середовище
-    colors_std = []
-    for mean in standard_means:
-        if np.isnan(mean):
-            colors_std.append("gray")
-        elif mean >= 200:
-            colors_std.append("#2ecc71")  # зелений — розв'язано
-        elif mean >= 0:
-            colors_std.append("#3498db")  # синій — вище нуля
-        else:
-            colors_std.append("#e74c3c")  # червоний — нижче нуля
-
-    bars_std = ax.barh(y_pos + bar_height / 2, standard_means, bar_height,
-                       xerr=standard_stds, label="Стандартне середовище",
-                       color=colors_std, alpha=0.8, capsize=3)
+    # Стандартне середовище: сірий — немає результату, зелений — розв'язано,
+    # синій — вище нуля, червоний — нижче нуля
+    colors_std = np.where(np.isnan(standard_means), "gray",
+                          np.where(standard_means >= 200, "#2ecc71",
+                                   np.where(standard_means >= 0, "#3498db", "#e74c3c"))).tolist()
+    ax.barh(y_pos + bar_height / 2, standard_means, bar_height,
+            xerr=standard_stds, label="Стандартне середовище",
+            color=colors_std, alpha=0.8, capsize=3)
 
     # Індивідуальне середовище
-    colors_ind = ["#f39c12" if w else "#9b59b6" for w in has_wind]
-    bars_ind = ax.barh(y_pos - bar_height / 2, individual_means, bar_height,
-                       label="Індивідуальне середовище",
-                       color=colors_ind, alpha=0.6, capsize=3)
+    colors_ind = ["#f39c12" if r["wind"] else "#9b59b6" for r in page]
+    ax.barh(y_pos - bar_height / 2, individual_means, bar_height,
+            label="Індивідуальне середовище",
+            color=colors_ind, alpha=0.6, capsize=3)
 
     # Оформлення
     ax.set_yticks(y_pos)
-    ax.set_yticklabels([f"#{i+1} {n}" for i, n in enumerate(names)])
+    ax.set_yticklabels([f"#{r['rank']} {r['name']}" for r in page])
     ax.set_xlabel("Середня винагорода (100 епізодів)")
-    ax.set_title("Турнірна таблиця — Лабораторна робота №3\nLunarLander DQN", fontsize=14, fontweight="bold")
 
     # Вертикальні лінії-орієнтири
     ax.axvline(x=200, color="green", linestyle="--", alpha=0.5, label='Поріг "розв\'язано" (200)')
@@ -222,28 +246,66 @@ def plot_leaderboard(results: list[dict], output_path: str = "leaderboard.png"):
     ax.grid(True, alpha=0.2, axis="x")
     ax.invert_yaxis()
 
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=150, bbox_inches="tight")
-    plt.show()
-    print(f"Графік збережено: {output_path}")
-
-
-def print_leaderboard(results: list[dict]):
-    """Вивести турнірну таблицю в консоль."""
-    sorted_results = sorted(results, key=lambda x: x["standard_mean"]
-                            if not np.isnan(x["standard_mean"]) else -1e6, reverse=True)
 
+def plot_leaderboard(ranked: list[dict], output_path: str = "leaderboard.png",
+                     per_page: int = 50, show: bool = False) -> list[str]:
+    """Побудувати візуальну турнірну таблицю з відсортованих результатів (rank_results).
+
+    Понад per_page студентів графік розбивається на сторінки з однаковим масштабом осі X.
+    Без show рендеринг іде через Agg без pyplot. Повертає шляхи збережених файлів.
+    """
+    if show:
+        import matplotlib.pyplot as plt
+        make_figure = plt.figure
+    else:
+        from matplotlib.figure import Figure
+        make_figure = Figure
+
+    n_pages = max(1, math.ceil(len(ranked) / per_page))
+    # Межі кожного стовпчика окремо: NaN у стандартному результаті не відкидає індивідуальний
+    lows = [r["standard_mean"] - r["standard_std"] for r in ranked] + [r["individual_mean"] for r in ranked]
+    highs = [r["standard_mean"] + r["standard_std"] for r in ranked] + [r["individual_mean"] for r in ranked]
+    lows = [v for v in lows if not np.isnan(v)]
+    highs = [v for v in highs if not np.isnan(v)]
+    xlim = (min(lows + [0.0]) - 20, max(highs + [220.0]) + 20)
+
+    base = Path(output_path)
+    paths = []
+    for page_no in range(n_pages):
+        page = ranked[page_no * per_page:(page_no + 1) * per_page]
+        fig = make_figure(figsize=(12, max(6, len(page) * 0.5)))
+        ax = fig.add_subplot()
+        _draw_page(ax, page)
+        ax.set_xlim(*xlim)
+        title = "Турнірна таблиця — Лабораторна робота №3\nLunarLander DQN"
+        if n_pages > 1:
+            title += f" (сторінка {page_no + 1}/{n_pages})"
+        ax.set_title(title, fontsize=14, fontweight="bold")
+        fig.tight_layout()
+
+        path = base if n_pages == 1 else base.with_name(f"{base.stem}_{page_no + 1:02d}{base.suffix}")
+        fig.savefig(path, dpi=150, bbox_inches="tight")
+        paths.append(str(path))
+        print(f"Графік збережено: {path}")
+
+    if show:
+        plt.show()
+    return paths
+
+
+def print_leaderboard(ranked: list[dict]):
+    """Вивести відсортовані результати (rank_results) в консоль."""
     print("\n" + "=" * 80)
     print("ТУРНІРНА ТАБЛИЦЯ — Лабораторна робота №3")
     print("=" * 80)
     print(f"{'#':<4} {'Студент':<20} {'A':>3} {'Стандарт':>10} {'Індивід.':>10} {'Вітер':>6} {'Гравітація':>10}")
     print("-" * 80)
 
-    for rank, r in enumerate(sorted_results, 1):
+    for r in ranked:
         std_str = f"{r['standard_mean']:.1f}" if not np.isnan(r["standard_mean"]) else "N/A"
         ind_str = f"{r['individual_mean']:.1f}" if not np.isnan(r["individual_mean"]) else "N/A"
         wind_str = "Так" if r["wind"] else "Ні"
-        print(f"{rank:<4} {r['name']:<20} {r['A']:>3} {std_str:>10} {ind_str:>10} {wind_str:>6} {r['gravity']:>10.1f}")
+        print(f"{r['rank']:<4} {r['name']:<20} {r['A']:>3} {std_str:>10} {ind_str:>10} {wind_str:>6} {r['gravity']:>10.1f}")
 
     print("=" * 80)
 
@@ -254,14 +316,22 @@ def main():
     parser.add_argument("--output", default="results.csv", help="Шлях до CSV з результатами")
     parser.add_argument("--episodes", type=int, default=100, help="Кількість епізодів для оцінки")
     parser.add_argument("--plot", default="leaderboard.png", help="Шлях до графіку турнірної таблиці")
+    parser.add_argument("--per-page", type=int, default=50, help="Студентів на одній сторінці графіку")
+    parser.add_argument("--no-show", action="store_true", help="Не відкривати вікно з графіком")
     args = parser.parse_args()
 
-    results = run_leaderboard(args.models_dir, args.episodes)
+    stream = StreamingCSVWriter(args.output)
+    try:
+        results = run_leaderboard(args.models_dir, args.episodes, on_result=stream.write)
+    finally:
+        stream.close()
 
     if results:
-        print_leaderboard(results)
-        save_csv(results, args.output)
-        plot_leaderboard(results, args.plot)
+        ranked = rank_results(results)
+        print_leaderboard(ranked)
+        save_csv(ranked, args.output)
+        plot_leaderboard(ranked, args.plot, per_page=args.per_page,
+                         show=not args.no_show and has_display())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,123 @@
+"""
+Benchmark the NumPy DQN inference path against ``DQN.load`` + ``model.predict``.
+
+Usage (from the scoreboard/ directory):
+    python -m benchmarks.bench_policy --model uploads/1/model_standard.zip
+    python -m benchmarks.bench_policy            # uses a freshly initialised LunarLander DQN
+
+Reports action agreement, per-step latency (single observation and batched) and
+the startup cost of a fresh worker process for each path.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from scoreboard.policy import load_q_policy
+
+_STARTUP_SNIPPETS = {
+    "sb3": (
+        "from stable_baselines3 import DQN\n"
+        "model = DQN.load({path!r})\n"
+        "model.predict(model.observation_space.sample(), deterministic=True)\n"
+    ),
+    "numpy": (
+        "import numpy as np\n"
+        "from scoreboard.policy import load_q_policy\n"
+        "policy = load_q_policy({path!r})\n"
+        "policy.predict(np.zeros(policy.obs_dim, dtype=np.float32))\n"
+    ),
+}
+
+
+def _make_model(directory: str) -> str:
+    import gymnasium as gym
+    from stable_baselines3 import DQN
+
+    path = str(Path(directory) / "model.zip")
+    DQN("MlpPolicy", gym.make("LunarLander-v3"), seed=0).save(path)
+    return path
+
+
+def _time_per_call(fn, n_calls: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls
+
+
+def _startup_seconds(kind: str, model_path: str, repeats: int) -> float:
+    code = (
+        "import time\n"
+        "_t = time.perf_counter()\n"
+        + _STARTUP_SNIPPETS[kind].format(path=model_path)
+        + "print(time.perf_counter() - _t)\n"
+    )
+    cwd = Path(__file__).resolve().parent.parent
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True,
+                             capture_output=True, text=True).stdout
+        runs.append(float(out.strip().splitlines()[-1]))
+    return min(runs)
+
+
+def run(model_path: str, n_obs: int, n_calls: int, batch_size: int, startup_repeats: int) -> dict:
+    from stable_baselines3 import DQN
+
+    model = DQN.load(model_path)
+    policy = load_q_policy(model_path)
+
+    rng = np.random.default_rng(0)
+    obs = np.stack([model.observation_space.sample() for _ in range(n_obs)])
+    sb3_actions, _ = model.predict(obs, deterministic=True)
+    agreement = float(np.mean(policy.predict(obs) == sb3_actions))
+
+    single = obs[0]
+    batch = obs[rng.integers(0, n_obs, batch_size)]
+    results = {
+        "model": model_path,
+        "action_agreement": agreement,
+        "sb3_step_us": _time_per_call(lambda: model.predict(single, deterministic=True), n_calls) * 1e6,
+        "numpy_step_us": _time_per_call(lambda: policy.predict(single), n_calls) * 1e6,
+        "sb3_batch_obs_us": _time_per_call(lambda: model.predict(batch, deterministic=True), n_calls) * 1e6 / batch_size,
+        "numpy_batch_obs_us": _time_per_call(lambda: policy.predict(batch), n_calls) * 1e6 / batch_size,
+    }
+    if startup_repeats > 0:
+        results["sb3_startup_s"] = _startup_seconds("sb3", model_path, startup_repeats)
+        results["numpy_startup_s"] = _startup_seconds("numpy", model_path, startup_repeats)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NumPy vs SB3 DQN inference benchmark")
+    parser.add_argument("--model", help="Path to an SB3 DQN zip (default: fresh LunarLander DQN)")
+    parser.add_argument("--observations", type=int, default=10_000, help="Observations used for the agreement check")
+    parser.add_argument("--calls", type=int, default=2_000, help="Timed predict calls per measurement")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch size for the batched measurement")
+    parser.add_argument("--startup-repeats", type=int, default=3, help="Fresh processes per startup measurement (0 to skip)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = str(Path(args.model).resolve()) if args.model else _make_model(tmp)
+        results = run(model_path, args.observations, args.calls, args.batch_size, args.startup_repeats)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for key, value in results.items():
+        print(f"{key:<22} {value:.3f}" if isinstance(value, float) else f"{key:<22} {value}")
+    if results["action_agreement"] < 1.0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
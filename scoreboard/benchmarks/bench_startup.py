@@ -0,0 +1,78 @@
+"""
+Measure cold-start cost of the scoreboard API process.
+
+Imports ``main`` in a fresh interpreter and reports wall-clock import time, peak
+RSS and whether any of the heavy ML modules were pulled in. Intended for CI:
+
+    python -m benchmarks.bench_startup --output startup.json --max-import-s 2 --max-rss-mb 150
+
+Exits with status 1 if a heavy module is imported or a threshold is exceeded.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Modules that must only ever be imported by evaluator worker processes.
+HEAVY_MODULES = ["torch", "stable_baselines3", "gymnasium", "numpy", "imageio", "Box2D"]
+
+_PROBE = """
+import json, resource, sys, time
+_t = time.perf_counter()
+import main
+elapsed = time.perf_counter() - _t
+heavy = {heavy!r}
+print(json.dumps({{
+    "import_s": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules_loaded": len(sys.modules),
+    "heavy_modules": [m for m in heavy if m in sys.modules],
+}}))
+"""
+
+
+def measure(repeats: int = 5) -> dict:
+    """Import ``main`` ``repeats`` times in fresh processes and keep the best run."""
+    cwd = Path(__file__).resolve().parent.parent
+    code = _PROBE.format(heavy=HEAVY_MODULES)
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], cwd=cwd, check=True,
+                             capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    best = min(runs, key=lambda r: r["import_s"])
+    best["import_s_runs"] = [r["import_s"] for r in runs]
+    best["heavy_modules"] = sorted({m for r in runs for m in r["heavy_modules"]})
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoreboard API startup benchmark")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters to start")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--max-import-s", type=float, help="Fail if `import main` takes longer")
+    parser.add_argument("--max-rss-mb", type=float, help="Fail if peak RSS after import is larger")
+    args = parser.parse_args()
+
+    results = measure(args.repeats)
+    print(json.dumps(results, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    failures = []
+    if results["heavy_modules"]:
+        failures.append(f"heavy modules imported by the API process: {', '.join(results['heavy_modules'])}")
+    if args.max_import_s is not None and results["import_s"] > args.max_import_s:
+        failures.append(f"import took {results['import_s']:.2f}s > {args.max_import_s}s")
+    if args.max_rss_mb is not None and results["max_rss_mb"] > args.max_rss_mb:
+        failures.append(f"RSS {results['max_rss_mb']:.0f}MB > {args.max_rss_mb}MB")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,14 @@ import sys
 
 from scoreboard import email_service, evaluator
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from scoreboard import config, db
 from scoreboard.hyperparams import compute_all_min_distances
-from scoreboard.scoring import compute_rank_score
+from scoreboard.ratelimit import TokenBucketLimiter, client_ip
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 logger = logging.getLogger(__name__)
@@ -25,9 +25,12 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     db.init_db()
     config.UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
+    email_service.start()
     evaluator.start()
     logger.info("Scoreboard started")
     yield
+    evaluator.stop()
+    email_service.stop()
 
 
 app = FastAPI(title="Lab 3 Scoreboard", lifespan=lifespan)
@@ -38,6 +41,33 @@ if _static_dir.exists():
     app.mount("/static", StaticFiles(directory=str(_static_dir)), name="static")
 
 
+# ── Rate limiting ──
+
+pin_email_limiter = TokenBucketLimiter(
+    capacity=config.PIN_REQUESTS_PER_EMAIL_BURST,
+    refill_per_second=config.PIN_REQUESTS_PER_EMAIL_HOURLY / 3600,
+)
+pin_ip_limiter = TokenBucketLimiter(
+    capacity=config.PIN_REQUESTS_PER_IP_BURST,
+    refill_per_second=config.PIN_REQUESTS_PER_IP_HOURLY / 3600,
+)
+
+
+def _client_ip(request: Request) -> str:
+    peer = request.client.host if request.client else None
+    return client_ip(peer, request.headers, config.TRUSTED_PROXIES)
+
+
+def _check_rate_limit(limiter: TokenBucketLimiter, key: str):
+    allowed, retry_after = limiter.allow(key)
+    if not allowed:
+        raise HTTPException(
+            429,
+            f"Забагато запитів. Спробуйте через {retry_after // 60} хв {retry_after % 60} сек",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
 # ── Models ──
 
 class PinRequest(BaseModel):
@@ -52,11 +82,14 @@ async def index():
 
 
 @app.post("/api/request-pin")
-async def request_pin(req: PinRequest):
+async def request_pin(req: PinRequest, request: Request):
     email = req.email.strip().lower()
     if not email.endswith("@lpnu.ua"):
         raise HTTPException(400, "Дозволені лише адреси @lpnu.ua")
 
+    _check_rate_limit(pin_ip_limiter, _client_ip(request))
+    _check_rate_limit(pin_email_limiter, email)
+
     in_cooldown, remaining = db.check_cooldown(email)
     if in_cooldown:
         minutes = remaining // 60
@@ -67,6 +100,7 @@ async def request_pin(req: PinRequest):
         )
 
     pin = db.create_pin(email)
+    # Only queues the message, delivery happens on the email sender thread
     email_service.send_pin_email(email, pin)
     return {"ok": True, "message": "PIN надіслано на вашу пошту"}
 
@@ -167,19 +201,29 @@ async def upload(
 
 @app.get("/api/scoreboard")
 async def scoreboard():
-    all_subs = db.get_all_submissions()
-
-    # Attach rank_score
-    for sub in all_subs:
-        sub["rank_score"] = compute_rank_score(sub)
-        sub["has_video"] = bool(sub.get("video_path"))
-
+    # Best submission per student, attempt counts and ranking all come from one SQL query;
+    # subgroup tabs rank each student's best submission within that subgroup.
     return {
         "subgroups": config.SUBGROUPS,
-        "submissions": all_subs,
+        "submissions": db.get_scoreboard(),
+        "subgroup_submissions": db.get_scoreboard(by_subgroup=True),
     }
 
 
+@app.get("/api/distribution/{sub_id}")
+async def get_distribution(sub_id: int, rewards: bool = True):
+    # Stored at evaluation time; ?rewards=false returns only the quantile summaries
+    distribution = db.get_reward_distribution(sub_id, include_rewards=rewards)
+    if distribution is None:
+        raise HTTPException(404, "Розподіл нагород не знайдено")
+    return {"submission_id": sub_id, **distribution}
+
+
+@app.get("/api/queue")
+async def evaluation_queue():
+    return evaluator.queue_stats()
+
+
 @app.get("/api/video/{sub_id}")
 async def get_video(sub_id: int):
     sub = db.get_submission(sub_id)
@@ -1,6 +1,8 @@
 import json
 import random
 import string
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlparse, urlunparse
 
@@ -8,8 +10,21 @@ import psycopg2
 import psycopg2.extras
 
 from scoreboard import config
-
-_conn: psycopg2.extensions.connection | None = None
+from scoreboard.distributions import decode_rewards, encode_rewards, summarize_rewards
+from scoreboard.scoring import rank_score_sql
+
+# One connection per thread: the API event loop and each evaluator dispatcher thread
+# commit and roll back independently. init_db bumps the generation, which makes every
+# thread reconnect (to its URL) on its next get_conn.
+_local = threading.local()
+_db_url: str | None = None
+_generation = 0
+
+# email -> (cached_at monotonic seconds, created_at of the latest submission or None).
+# Kept fresh by create_submission; the TTL only bounds staleness from other writers.
+# Any address ending in @lpnu.ua can be looked up, so expired entries are pruned and the
+# size is capped at COOLDOWN_CACHE_MAX_KEYS (oldest entries dropped first).
+_cooldown_cache: dict[str, tuple[float, datetime | None]] = {}
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS pins (
@@ -41,7 +56,10 @@ CREATE TABLE IF NOT EXISTS submissions (
     superseded_by         INTEGER,
     created_at            TEXT NOT NULL,
     evaluated_at          TEXT,
-    video_path            TEXT
+    video_path            TEXT,
+    standard_rewards      BYTEA,
+    individual_rewards    BYTEA,
+    reward_summary        TEXT
 );
 
 CREATE TABLE IF NOT EXISTS config (
@@ -78,18 +96,33 @@ def _ensure_database_exists(url: str):
 
 
 def get_conn(db_url: str | None = None) -> psycopg2.extensions.connection:
-    global _conn
-    if _conn is None or _conn.closed:
-        url = db_url or config.DATABASE_URL
-        _conn = psycopg2.connect(url, cursor_factory=psycopg2.extras.RealDictCursor)
-        _conn.autocommit = False
-    return _conn
+    """The calling thread's connection, opened on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and (conn.closed or _local.generation != _generation):
+        close_conn()
+        conn = None
+    if conn is None:
+        url = db_url or _db_url or config.DATABASE_URL
+        conn = psycopg2.connect(url, cursor_factory=psycopg2.extras.RealDictCursor)
+        conn.autocommit = False
+        _local.conn, _local.generation = conn, _generation
+    return conn
+
+
+def close_conn():
+    """Close the calling thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    _local.conn = None
+    if conn is not None and not conn.closed:
+        conn.close()
 
 
 def init_db(db_url: str | None = None):
-    global _conn
-    _conn = None
+    global _db_url, _generation
+    _cooldown_cache.clear()
     url = db_url or config.DATABASE_URL
+    _db_url = url
+    _generation += 1
     _ensure_database_exists(url)
     conn = get_conn(url)
     with conn.cursor() as cur:
@@ -104,6 +137,19 @@ def init_db(db_url: str | None = None):
         cur.execute(
             "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS video_path TEXT"
         )
+        # Per-episode rewards as float32 arrays (see distributions.py) and their JSON summary
+        cur.execute(
+            "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS standard_rewards BYTEA"
+        )
+        cur.execute(
+            "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS individual_rewards BYTEA"
+        )
+        cur.execute(
+            "ALTER TABLE submissions ADD COLUMN IF NOT EXISTS reward_summary TEXT"
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS submissions_email_created_at_idx ON submissions (email, created_at)"
+        )
     conn.commit()
 
 
@@ -147,11 +193,10 @@ def verify_pin(email: str, pin: str) -> bool:
     return True
 
 
-def check_cooldown(email: str) -> tuple[bool, int]:
-    """Check if the email is in a cooldown period after a submission.
-
-    Returns (is_in_cooldown, remaining_seconds).
-    """
+def _last_submission_time(email: str) -> datetime | None:
+    cached = _cooldown_cache.get(email)
+    if cached is not None and time.monotonic() - cached[0] < config.COOLDOWN_CACHE_SECONDS:
+        return cached[1]
     conn = get_conn()
     with conn.cursor() as cur:
         cur.execute(
@@ -159,9 +204,38 @@ def check_cooldown(email: str) -> tuple[bool, int]:
             (email,),
         )
         row = cur.fetchone()
-    if row is None:
+    last_submission = None if row is None else datetime.fromisoformat(dict(row)["created_at"])  # type: ignore[arg-type]
+    _cache_cooldown(email, last_submission)
+    return last_submission
+
+
+def _cache_cooldown(email: str, last_submission: datetime | None):
+    now = time.monotonic()
+    _cooldown_cache.pop(email, None)  # re-inserted last, dict order stays oldest first
+    _cooldown_cache[email] = (now, last_submission)
+    if len(_cooldown_cache) > config.COOLDOWN_CACHE_MAX_KEYS:
+        _prune_cooldown_cache(now)
+
+
+def _prune_cooldown_cache(now: float):
+    """Forget expired entries, then the oldest ones while the cache is still over its cap."""
+    for key in [k for k, (cached_at, _) in _cooldown_cache.items() if now - cached_at >= config.COOLDOWN_CACHE_SECONDS]:
+        del _cooldown_cache[key]
+    while len(_cooldown_cache) > config.COOLDOWN_CACHE_MAX_KEYS:
+        del _cooldown_cache[next(iter(_cooldown_cache))]
+
+
+def check_cooldown(email: str) -> tuple[bool, int]:
+    """Check if the email is in a cooldown period after a submission.
+
+    The latest submission time is cached for COOLDOWN_CACHE_SECONDS, so repeated
+    PIN requests and uploads do not hit the database every time.
+
+    Returns (is_in_cooldown, remaining_seconds).
+    """
+    last_submission = _last_submission_time(email)
+    if last_submission is None:
         return False, 0
-    last_submission = datetime.fromisoformat(dict(row)["created_at"])  # type: ignore[arg-type]
     cooldown_end = last_submission + timedelta(minutes=config.UPLOAD_COOLDOWN_MINUTES)
     now = datetime.now(timezone.utc)
     if now < cooldown_end:
@@ -172,6 +246,7 @@ def check_cooldown(email: str) -> tuple[bool, int]:
 
 def create_submission(email, name, surname, subgroup, param_a, hyperparameters, model_standard_path, model_individual_path) -> int:
     conn = get_conn()
+    created_at = _now_iso()
     with conn.cursor() as cur:
         cur.execute(
             """INSERT INTO submissions
@@ -180,7 +255,7 @@ def create_submission(email, name, surname, subgroup, param_a, hyperparameters,
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 'pending', %s)
             RETURNING id""",
             (email, name, surname, subgroup, param_a, hyperparameters,
-             model_standard_path, model_individual_path, _now_iso()),
+             model_standard_path, model_individual_path, created_at),
         )
         new_id: int = dict(cur.fetchone())["id"]  # type: ignore[arg-type]
         cur.execute(
@@ -188,6 +263,7 @@ def create_submission(email, name, surname, subgroup, param_a, hyperparameters,
             (new_id, email, new_id),
         )
     conn.commit()
+    _cache_cooldown(email, datetime.fromisoformat(created_at))
     return new_id
 
 
@@ -199,6 +275,15 @@ def get_submission(sub_id: int) -> dict | None:
     return dict(row) if row else None
 
 
+def count_earlier_submissions(email: str, sub_id: int) -> int:
+    """How many submissions the student made before ``sub_id``."""
+    conn = get_conn()
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) AS n FROM submissions WHERE email = %s AND id < %s", (email, sub_id))
+        row = cur.fetchone()
+    return dict(row)["n"]  # type: ignore[arg-type]
+
+
 def get_all_submissions() -> list[dict]:
     conn = get_conn()
     with conn.cursor() as cur:
@@ -209,6 +294,53 @@ def get_all_submissions() -> list[dict]:
     return [dict(r) for r in rows]
 
 
+def _scoreboard_query(by_subgroup: bool = False) -> str:
+    """One row per student: their best evaluated submission (most recent if none is done),
+    with its attempt number and the student's total attempts, ordered by rank score.
+    With ``by_subgroup`` one row per student and subgroup, counting only that subgroup's submissions.
+
+    Mirrors the formula in scoring.py; ties between done submissions go to the earlier one.
+    """
+    rank = rank_score_sql()
+    partition = "email, subgroup" if by_subgroup else "email"
+    return f"""
+        WITH ranked AS (
+            SELECT
+                id, email, name, surname, subgroup, param_a, hyperparam_min_dist,
+                standard_mean, standard_std, individual_mean, individual_std,
+                status, error_message, superseded_by, created_at, evaluated_at,
+                COALESCE(video_path, '') <> '' AS has_video,
+                {rank} AS rank_score,
+                ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY created_at, id) AS attempt_number,
+                COUNT(*) OVER (PARTITION BY {partition}) AS total_attempts,
+                ROW_NUMBER() OVER (
+                    PARTITION BY {partition}
+                    ORDER BY (status = 'done') DESC,
+                             CASE WHEN status = 'done' THEN {rank} END DESC,
+                             CASE WHEN status = 'done' THEN created_at END ASC,
+                             created_at DESC
+                ) AS pick
+            FROM submissions
+        )
+        SELECT * FROM ranked
+        WHERE pick = 1
+        ORDER BY rank_score DESC, created_at ASC
+    """
+
+
+def get_scoreboard(by_subgroup: bool = False) -> list[dict]:
+    conn = get_conn()
+    with conn.cursor() as cur:
+        cur.execute(_scoreboard_query(by_subgroup))
+        rows = cur.fetchall()
+    result = []
+    for r in rows:
+        row = dict(r)
+        del row["pick"]
+        result.append(row)
+    return result
+
+
 def get_active_submissions() -> list[dict]:
     conn = get_conn()
     with conn.cursor() as cur:
@@ -237,20 +369,58 @@ def set_status(sub_id: int, status: str):
 
 
 def update_evaluation(sub_id: int, standard_mean: float, standard_std: float,
-                      individual_mean: float, individual_std: float):
+                      individual_mean: float, individual_std: float,
+                      standard_rewards: list[float] | None = None,
+                      individual_rewards: list[float] | None = None):
+    """Store evaluation results; per-episode rewards are kept when given."""
+    summary = None
+    if standard_rewards is not None or individual_rewards is not None:
+        summary = json.dumps({
+            "standard": summarize_rewards(standard_rewards or []),
+            "individual": summarize_rewards(individual_rewards or []),
+        })
     conn = get_conn()
     with conn.cursor() as cur:
         cur.execute(
             """UPDATE submissions SET
                 standard_mean = %s, standard_std = %s,
                 individual_mean = %s, individual_std = %s,
+                standard_rewards = %s, individual_rewards = %s, reward_summary = %s,
                 status = 'done', evaluated_at = %s
             WHERE id = %s""",
-            (standard_mean, standard_std, individual_mean, individual_std, _now_iso(), sub_id),
+            (standard_mean, standard_std, individual_mean, individual_std,
+             None if standard_rewards is None else psycopg2.Binary(encode_rewards(standard_rewards)),
+             None if individual_rewards is None else psycopg2.Binary(encode_rewards(individual_rewards)),
+             summary, _now_iso(), sub_id),
         )
     conn.commit()
 
 
+def get_reward_distribution(sub_id: int, include_rewards: bool = True) -> dict | None:
+    """Stored per-episode rewards and their summary, or None if the submission has none."""
+    conn = get_conn()
+    with conn.cursor() as cur:
+        if include_rewards:
+            cur.execute(
+                "SELECT standard_rewards, individual_rewards, reward_summary FROM submissions WHERE id = %s",
+                (sub_id,),
+            )
+        else:
+            cur.execute("SELECT reward_summary FROM submissions WHERE id = %s", (sub_id,))
+        row = cur.fetchone()
+    if row is None or dict(row)["reward_summary"] is None:
+        return None
+    row = dict(row)
+    summary = json.loads(row["reward_summary"])
+    result = {}
+    for kind in ("standard", "individual"):
+        result[kind] = {"summary": summary[kind]}
+        if include_rewards:
+            blob = row[f"{kind}_rewards"]
+            result[kind]["rewards"] = decode_rewards(blob) if blob is not None else []
+    return result
+
+
 def update_evaluation_error(sub_id: int, error_message: str):
     conn = get_conn()
     with conn.cursor() as cur:
@@ -0,0 +1,42 @@
+"""
+Compact storage for per-episode evaluation rewards.
+
+Rewards are stored as little-endian float32 arrays (4 bytes per episode) in BYTEA
+columns, next to a JSON summary of quantiles so the scoreboard never has to decode
+the arrays. Pure Python on purpose: the API process does not import NumPy.
+"""
+
+import math
+import struct
+
+from scoreboard.stats import percentile
+
+QUANTILES = (5, 25, 50, 75, 95)
+
+
+def encode_rewards(rewards: list[float]) -> bytes:
+    return struct.pack(f"<{len(rewards)}f", *rewards)
+
+
+def decode_rewards(blob: bytes | memoryview) -> list[float]:
+    blob = bytes(blob)
+    if len(blob) % 4:
+        raise ValueError(f"Reward blob length {len(blob)} is not a multiple of 4")
+    return list(struct.unpack(f"<{len(blob) // 4}f", blob))
+
+
+def summarize_rewards(rewards: list[float]) -> dict:
+    """Episode count, mean, population std, min/max and the QUANTILES of ``rewards``."""
+    if not rewards:
+        return {"count": 0}
+    mean = sum(rewards) / len(rewards)
+    summary = {
+        "count": len(rewards),
+        "mean": mean,
+        "std": math.sqrt(sum((r - mean) ** 2 for r in rewards) / len(rewards)),
+        "min": min(rewards),
+        "max": max(rewards),
+    }
+    for q in QUANTILES:
+        summary[f"p{q:02d}"] = percentile(rewards, q)
+    return summary
@@ -1,12 +1,193 @@
-import resend
+import heapq
+import itertools
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from pathlib import Path
 
 from scoreboard import config
 
-def send_pin_email(to_email: str, pin: str):
-    """Send a PIN verification email via Resend."""
-    resend.api_key = config.RESEND_API_KEY
+logger = logging.getLogger(__name__)
+
+# Outbound mail is queued and sent by a background thread, so request handlers
+# never wait on the mail provider. None is the shutdown sentinel.
+_queue: queue.Queue[dict | None] = queue.Queue()
+_thread: threading.Thread | None = None
+_backend = None
+# A sender still finishing retries after a timed-out stop() is told by start() to go on
+# consuming the queue instead of exiting, so there is never a second sender. _lifecycle
+# makes the sender's decision to exit and start()'s check of _running atomic.
+_lifecycle = threading.Lock()
+_running = False
+_resume = False
+_stop_timed_out = False
+
+
+class ResendBackend:
+    """Sends through Resend; several queued messages go out as one batch request."""
+
+    def send_batch(self, messages: list[dict]):
+        import resend  # imported lazily, it is slow to import and only needed when sending
+
+        resend.api_key = config.RESEND_API_KEY
+        if len(messages) == 1:
+            resend.Emails.send(messages[0])
+        else:
+            resend.Batch.send(messages)
+
+
+class LocalSinkBackend:
+    """Keeps sent messages in memory and optionally writes each one as JSON into a directory."""
+
+    def __init__(self, directory: str | Path | None = None):
+        self.directory = Path(directory) if directory else None
+        self.sent: list[dict] = []
+        self.batches: list[int] = []
+
+    def send_batch(self, messages: list[dict]):
+        self.batches.append(len(messages))
+        for message in messages:
+            self.sent.append(message)
+            if self.directory is not None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                name = f"{time.time_ns()}_{len(self.sent)}.json"
+                (self.directory / name).write_text(json.dumps(message, ensure_ascii=False), encoding="utf-8")
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if config.EMAIL_BACKEND == "local":
+            _backend = LocalSinkBackend(config.EMAIL_SINK_DIR or None)
+        else:
+            _backend = ResendBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """Replace the delivery backend (tests, local development)."""
+    global _backend
+    _backend = backend
+
+
+def _is_transient(exc: Exception) -> bool:
+    """Worth retrying later: rate limiting, provider-side errors and network failures."""
+    code = getattr(exc, "code", None)
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return isinstance(exc, OSError)  # ConnectionError, TimeoutError, requests' errors
+    return code == 429 or code >= 500
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter before attempt + 1."""
+    delay = min(config.EMAIL_RETRY_MAX_SECONDS, config.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempt - 1))
+    return delay * random.uniform(0.5, 1.0)
 
-    resend.Emails.send({
+
+def _deliver(batch: list[dict], attempt: int) -> list[dict]:
+    """
+    Send a batch once. Returns the messages to try again later, empty when every
+    message was either sent or given up on.
+
+    The provider validates a batch as a whole, so when it rejects one for a
+    non-transient reason (e.g. a malformed address) the messages are sent one by
+    one and only those rejected on their own are dropped.
+    """
+    try:
+        get_backend().send_batch(batch)
+        return []
+    except Exception as exc:
+        if not _is_transient(exc):
+            if len(batch) > 1:
+                logger.warning(f"Batch of {len(batch)} emails rejected ({exc}), sending them one by one")
+                return [message for single in batch for message in _deliver([single], attempt)]
+            logger.exception(f"Dropping email to {batch[0].get('to')}, rejected by the provider")
+            return []
+        if attempt >= config.EMAIL_MAX_ATTEMPTS:
+            logger.exception(f"Giving up on {len(batch)} email(s) after {attempt} attempts")
+            return []
+        logger.warning(f"Email send failed (attempt {attempt}), will retry", exc_info=True)
+        return batch
+
+
+def _collect_batch(first: dict) -> tuple[list[dict], bool]:
+    """Gather up to EMAIL_BATCH_SIZE queued messages. Returns (batch, shutdown requested)."""
+    batch = [first]
+    deadline = time.monotonic() + config.EMAIL_BATCH_WINDOW_SECONDS
+    while len(batch) < config.EMAIL_BATCH_SIZE:
+        timeout = deadline - time.monotonic()
+        try:
+            extra = _queue.get(timeout=max(timeout, 0)) if timeout > 0 else _queue.get_nowait()
+        except queue.Empty:
+            break
+        if extra is None:
+            _queue.task_done()
+            return batch, True
+        batch.append(extra)
+    return batch, False
+
+
+def _worker():
+    """
+    Background sender — collects up to EMAIL_BATCH_SIZE queued messages per request.
+
+    Failed batches wait for their retry in a heap instead of a sleep, so new messages
+    keep going out meanwhile. A message counts as done for flush() once it is sent or
+    given up on.
+    """
+    retries: list[tuple[float, int, int, list[dict]]] = []  # (ready_at, seq, attempt, batch)
+    seq = itertools.count()
+    global _running, _resume
+    stopping = False
+    while True:
+        if stopping:
+            with _lifecycle:
+                if _resume:
+                    _resume = False
+                    stopping = False
+                elif not retries:
+                    _running = False
+                    return
+        now = time.monotonic()
+        if retries and retries[0][0] <= now:
+            _, _, attempt, batch = heapq.heappop(retries)
+        elif stopping:
+            time.sleep(retries[0][0] - now)
+            continue
+        else:
+            try:
+                message = _queue.get(timeout=retries[0][0] - now if retries else None)
+            except queue.Empty:
+                continue
+            if message is None:
+                _queue.task_done()
+                stopping = True
+                continue
+            batch, stopping = _collect_batch(message)
+            attempt = 1
+        pending = []
+        try:
+            pending = _deliver(batch, attempt)
+        finally:
+            if pending:
+                heapq.heappush(retries, (time.monotonic() + _retry_delay(attempt), next(seq), attempt + 1, pending))
+            for _ in range(len(batch) - len(pending)):
+                _queue.task_done()
+
+
+def enqueue(message: dict):
+    """Queue a Resend-style message dict ('from', 'to', 'subject', 'text') for delivery."""
+    _queue.put(message)
+
+
+def send_pin_email(to_email: str, pin: str):
+    """Queue a PIN verification email. Returns immediately."""
+    enqueue({
         "from": config.RESEND_FROM_EMAIL,
         "to": [to_email],
         "subject": "Код підтвердження для турнірної таблиці — ЛР №3",
@@ -16,3 +197,45 @@ def send_pin_email(to_email: str, pin: str):
             "Якщо ви не запитували цей код, проігноруйте цей лист."
         ),
     })
+
+
+def flush():
+    """Block until every queued message, including those awaiting a retry, has been sent or given up on."""
+    _queue.join()
+
+
+def start():
+    """Start the background sender thread (idempotent)."""
+    global _thread, _running, _resume, _stop_timed_out
+    with _lifecycle:
+        if _running:
+            if _stop_timed_out:
+                _stop_timed_out = False
+                _resume = True
+            return
+        _running = True
+        _resume = _stop_timed_out = False
+        _thread = threading.Thread(target=_worker, daemon=True, name="email-sender")
+        _thread.start()
+    logger.info(f"Email sender started ({type(get_backend()).__name__})")
+
+
+def stop(timeout: float = 10.0):
+    """
+    Send what is already queued, then stop the sender thread. If it is still busy after
+    ``timeout`` (e.g. waiting for retries) it keeps running and stays registered; a later
+    start() makes it keep consuming the queue rather than adding a second sender.
+    """
+    global _thread, _stop_timed_out
+    if _thread is None:
+        return
+    if not _stop_timed_out:  # the sender has its stop request already
+        _queue.put(None)
+    _thread.join(timeout)
+    with _lifecycle:
+        if _running:
+            _stop_timed_out = True
+            logger.warning(f"Email sender still running after {timeout}s, leaving it to finish pending retries")
+            return
+        _stop_timed_out = False
+        _thread = None
@@ -1,14 +1,49 @@
 import logging
-import queue
+import multiprocessing
 import threading
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from scoreboard import db
 from scoreboard import config
+from scoreboard import worker
+from scoreboard.scheduler import FairScheduler, Job
 
 logger = logging.getLogger(__name__)
 
-_queue: queue.Queue[int] = queue.Queue()
+# Jobs are ordered fairly across students rather than FIFO; a student's newer
+# upload replaces their queued one (see scheduler.FairScheduler).
+_scheduler = FairScheduler()
+
+# Evaluation runs in separate processes so the API process never imports
+# gymnasium / stable-baselines3 / torch. "spawn" keeps children clean of the
+# parent's threads and DB connection.
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+# Environment parameters each new worker process builds environments for up front.
+_warm_params: list[dict] = [{}]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=config.EVALUATOR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=worker.warm_up,
+                initargs=(list(_warm_params),),
+            )
+        return _pool
+
+
+def _reset_pool():
+    """Drop a broken pool so the next job starts fresh worker processes."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
 
 
 def compute_individual_params(A: int) -> dict:
@@ -24,45 +59,11 @@ def compute_individual_params(A: int) -> dict:
     return params
 
 
-def _evaluate_model(model_path: str, env_kwargs: dict, n_episodes: int) -> dict:
-    """Evaluate a single model. Imports SB3/gym lazily to keep module importable."""
-    import gymnasium as gym
-    from stable_baselines3 import DQN
-    from stable_baselines3.common.evaluation import evaluate_policy
-
-    model = DQN.load(model_path)
-    env = gym.make("LunarLander-v3", **env_kwargs)
-    mean_reward, std_reward = evaluate_policy(model, env, n_eval_episodes=n_episodes)
-    env.close()
-    return {"mean_reward": float(mean_reward), "std_reward": float(std_reward)}
-
-
-def _record_video(model_path: str, env_kwargs: dict, output_path: str, seed: int = 42) -> None:
-    """Record one deterministic episode as MP4. Requires imageio[ffmpeg]."""
-    import imageio
-    import gymnasium as gym
-    from stable_baselines3 import DQN
-
-    model = DQN.load(model_path)
-    env = gym.make("LunarLander-v3", render_mode="rgb_array", **env_kwargs)
-    frames = []
-    obs, _ = env.reset(seed=seed)
-    terminated, truncated = False, False
-    max_frames = 1500
-    while not (terminated or truncated) and len(frames) < max_frames:
-        frames.append(env.render())
-        action, _ = model.predict(obs, deterministic=True)
-        obs, _, terminated, truncated, _ = env.step(action)
-    frames.append(env.render())
-    env.close()
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    imageio.mimsave(output_path, frames, fps=30, macro_block_size=1)
-
-
 def _worker():
-    """Background worker thread — processes one submission at a time."""
+    """Dispatcher thread — hands one submission at a time to the process pool."""
     while True:
-        sub_id = _queue.get()
+        job = _scheduler.get()
+        sub_id = job.sub_id
         try:
             sub = db.get_submission(sub_id)
             if sub is None or sub["superseded_by"] is not None:
@@ -71,53 +72,100 @@ def _worker():
             logger.info(f"Evaluating submission {sub_id} ({sub['name']} {sub['surname']})")
             db.set_status(sub_id, "evaluating")
 
-            n_episodes = config.EVALUATION_EPISODES
-
-            # Standard environment
-            std_result = _evaluate_model(sub["model_standard_path"], {}, n_episodes)
-
-            # Individual environment
             ind_params = compute_individual_params(sub["param_a"])
-            ind_result = _evaluate_model(sub["model_individual_path"], ind_params, n_episodes)
-
+            video_path = str(config.UPLOADS_DIR / str(sub_id) / "demo_individual.mp4")
+            try:
+                result = _get_pool().submit(
+                    worker.evaluate_submission,
+                    sub["model_standard_path"],
+                    sub["model_individual_path"],
+                    ind_params,
+                    config.EVALUATION_EPISODES,
+                    video_path,
+                ).result()
+            except BrokenProcessPool:
+                _reset_pool()
+                raise
+
+            std_result, ind_result = result["standard"], result["individual"]
             db.update_evaluation(
                 sub_id,
                 standard_mean=std_result["mean_reward"],
                 standard_std=std_result["std_reward"],
                 individual_mean=ind_result["mean_reward"],
                 individual_std=ind_result["std_reward"],
+                standard_rewards=std_result["rewards"],
+                individual_rewards=ind_result["rewards"],
             )
             logger.info(f"Submission {sub_id} done: std={std_result['mean_reward']:.1f}, ind={ind_result['mean_reward']:.1f}")
 
-            # Record demo video for individual model (best-effort)
-            video_path = str(config.UPLOADS_DIR / str(sub_id) / "demo_individual.mp4")
-            try:
-                _record_video(sub["model_individual_path"], ind_params, video_path)
+            # Demo video for individual model is best-effort
+            if result["video_error"] is None:
                 db.update_video_path(sub_id, video_path)
                 logger.info(f"Demo video saved for submission {sub_id}")
-            except Exception:
-                logger.exception(f"Video recording failed for submission {sub_id} (non-fatal)")
+            else:
+                logger.warning(f"Video recording failed for submission {sub_id} (non-fatal): {result['video_error']}")
 
         except Exception as e:
             logger.exception(f"Evaluation failed for submission {sub_id}")
             db.update_evaluation_error(sub_id, str(e))
         finally:
-            _queue.task_done()
+            _scheduler.task_done()
+
+
+def _make_job(sub: dict) -> Job:
+    return Job(
+        sub_id=sub["id"],
+        email=sub["email"],
+        subgroup=sub["subgroup"],
+        created_at=sub["created_at"],
+        is_reattempt=db.count_earlier_submissions(sub["email"], sub["id"]) > 0,
+    )
 
 
 def enqueue(sub_id: int):
     """Add a submission to the evaluation queue."""
-    _queue.put(sub_id)
+    sub = db.get_submission(sub_id)
+    if sub is None:
+        return
+    superseded = _scheduler.put(_make_job(sub))
+    if superseded is not None:
+        logger.info(f"Dropped queued submission {superseded.sub_id}, superseded by {sub_id}")
+
+
+def queue_stats() -> dict:
+    """Queue length and per-subgroup wait-time percentiles (seconds)."""
+    return {
+        "queued": _scheduler.qsize(),
+        "dropped_superseded": _scheduler.dropped,
+        "wait_seconds": _scheduler.wait_stats(),
+    }
 
 
 def start():
-    """Start the background evaluator thread. Re-queues any pending submissions."""
+    """Start the evaluator dispatcher threads. Re-queues any pending submissions."""
     pending = db.get_pending_submissions()
     for sub in pending:
-        _queue.put(sub["id"])
+        _scheduler.put(_make_job(sub))
     if pending:
         logger.info(f"Re-queued {len(pending)} pending submissions")
 
-    t = threading.Thread(target=_worker, daemon=True, name="evaluator")
-    t.start()
-    logger.info("Background evaluator started")
+    for sub in pending:
+        params = compute_individual_params(sub["param_a"])
+        if params not in _warm_params and len(_warm_params) < config.EVALUATION_ENV_CACHE_SIZE:
+            _warm_params.append(params)
+
+    # Start the worker processes now so imports and environment building happen before the first job
+    pool = _get_pool()
+    for _ in range(config.EVALUATOR_WORKERS):
+        pool.submit(worker.ready)
+
+    for i in range(config.EVALUATOR_WORKERS):
+        t = threading.Thread(target=_worker, daemon=True, name=f"evaluator-{i}")
+        t.start()
+    logger.info(f"Background evaluator started ({config.EVALUATOR_WORKERS} worker process(es))")
+
+
+def stop():
+    """Shut down the worker processes."""
+    _reset_pool()
@@ -0,0 +1,262 @@
+"""
+Lightweight NumPy inference for DQN models saved by stable-baselines3.
+
+The SB3 zip stores the policy weights as a ``torch.save`` archive (``policy.pth``).
+That archive is a zip with a pickled state dict whose tensors point at raw
+little-endian storages, so the Q-network can be rebuilt without importing torch.
+Only the default ``MlpPolicy`` layout (flatten extractor + Linear/activation stack)
+is supported; anything else raises ``UnsupportedPolicyError`` so callers can fall
+back to ``DQN.load``.
+"""
+
+import io
+import json
+import pickle
+import re
+import zipfile
+from collections import OrderedDict
+
+import numpy as np
+
+_STORAGE_DTYPES = {
+    "FloatStorage": np.float32,
+    "DoubleStorage": np.float64,
+    "HalfStorage": np.float16,
+    "LongStorage": np.int64,
+    "IntStorage": np.int32,
+    "ShortStorage": np.int16,
+    "CharStorage": np.int8,
+    "ByteStorage": np.uint8,
+    "BoolStorage": np.bool_,
+}
+
+_LAYER_KEY = re.compile(r"^q_net\.q_net\.(\d+)\.(weight|bias)$")
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0, out=x)
+
+
+def _tanh(x: np.ndarray) -> np.ndarray:
+    return np.tanh(x, out=x)
+
+
+def _leaky_relu(x: np.ndarray) -> np.ndarray:
+    return np.where(x > 0, x, x * np.float32(0.01))
+
+
+def _elu(x: np.ndarray) -> np.ndarray:
+    return np.where(x > 0, x, np.expm1(np.minimum(x, 0)))
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    "ReLU": _relu,
+    "Tanh": _tanh,
+    "LeakyReLU": _leaky_relu,
+    "ELU": _elu,
+    "Sigmoid": _sigmoid,
+    "Identity": lambda x: x,
+}
+
+
+class UnsupportedPolicyError(ValueError):
+    """The model zip cannot be evaluated by the NumPy path."""
+
+
+class NumpyQPolicy:
+    """Greedy Q-network policy: a stack of dense layers evaluated with NumPy."""
+
+    def __init__(self, layers: list[tuple[np.ndarray, np.ndarray]], activation: str = "ReLU",
+                 action_start: int = 0):
+        if not layers:
+            raise UnsupportedPolicyError("Q-network has no layers")
+        if activation not in ACTIVATIONS:
+            raise UnsupportedPolicyError(f"Unsupported activation: {activation}")
+        # Store transposed weights so the forward pass is a plain (batch, in) @ (in, out).
+        self.layers = [
+            (np.ascontiguousarray(w.T, dtype=np.float32), np.asarray(b, dtype=np.float32))
+            for w, b in layers
+        ]
+        self.activation = activation
+        self._activation_fn = ACTIVATIONS[activation]
+        self.action_start = action_start
+        self.obs_dim: int = self.layers[0][0].shape[0]
+        self.n_actions: int = self.layers[-1][0].shape[1]
+
+    def q_values(self, obs: np.ndarray) -> np.ndarray:
+        """Return Q-values with shape (batch, n_actions) for a batch of observations."""
+        x = np.asarray(obs, dtype=np.float32).reshape(-1, self.obs_dim)
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            x = x @ w
+            x += b
+            if i != last:
+                x = self._activation_fn(x)
+        return x
+
+    def predict(self, obs: np.ndarray) -> np.ndarray:
+        """Greedy actions. A single observation gives a 0-d array, a batch gives shape (batch,)."""
+        obs = np.asarray(obs, dtype=np.float32)
+        actions = self.q_values(obs).argmax(axis=1) + self.action_start
+        if obs.ndim == 1:
+            return actions[0]
+        return actions
+
+
+class _TorchStateDictUnpickler(pickle.Unpickler):
+    """Unpickle a ``torch.save`` state dict into NumPy arrays."""
+
+    def __init__(self, file, archive: zipfile.ZipFile, prefix: str):
+        super().__init__(file)
+        self._archive = archive
+        self._prefix = prefix
+
+    def find_class(self, module, name):
+        if module == "collections" and name == "OrderedDict":
+            return OrderedDict
+        if module == "torch._utils" and name == "_rebuild_tensor_v2":
+            return _rebuild_tensor
+        if module == "torch._utils" and name == "_rebuild_parameter":
+            return lambda data, requires_grad, backward_hooks: data
+        if module == "torch" and name in _STORAGE_DTYPES:
+            return _STORAGE_DTYPES[name]
+        raise UnsupportedPolicyError(f"Unexpected object in policy weights: {module}.{name}")
+
+    def persistent_load(self, pid):
+        typename, dtype, key, _location, numel = pid
+        if typename != "storage":
+            raise UnsupportedPolicyError(f"Unexpected persistent id: {typename}")
+        raw = self._archive.read(f"{self._prefix}data/{key}")
+        return np.frombuffer(raw, dtype=np.dtype(dtype).newbyteorder("<"), count=numel)
+
+
+def _rebuild_tensor(storage, storage_offset, size, stride, requires_grad=False, backward_hooks=None, metadata=None):
+    itemsize = storage.dtype.itemsize
+    view = np.lib.stride_tricks.as_strided(
+        storage[storage_offset:],
+        shape=tuple(size),
+        strides=tuple(s * itemsize for s in stride),
+    )
+    return np.array(view)
+
+
+def _load_state_dict(policy_bytes: bytes) -> dict[str, np.ndarray]:
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(policy_bytes))
+    except zipfile.BadZipFile:
+        raise UnsupportedPolicyError("Legacy (non-zip) torch serialization is not supported")
+    with archive:
+        pkl_name = next((n for n in archive.namelist() if n.endswith("data.pkl")), None)
+        if pkl_name is None:
+            raise UnsupportedPolicyError("policy.pth has no data.pkl")
+        prefix = pkl_name[: -len("data.pkl")]
+        byteorder = f"{prefix}byteorder"
+        if byteorder in archive.namelist() and archive.read(byteorder).strip() != b"little":
+            raise UnsupportedPolicyError("Big-endian weights are not supported")
+        with archive.open(pkl_name) as f:
+            return _TorchStateDictUnpickler(f, archive, prefix).load()
+
+
+def _activation_name(policy_kwargs: dict) -> str:
+    """Extract the activation class name from the JSON-friendly policy_kwargs entry."""
+    activation_repr = policy_kwargs.get("activation_fn")
+    if activation_repr is None:
+        return "ReLU"
+    # Stored as "<class 'torch.nn.modules.activation.Tanh'>"
+    match = re.search(r"\.(\w+)'>$", str(activation_repr))
+    if match is None:
+        raise UnsupportedPolicyError(f"Cannot parse activation_fn: {activation_repr}")
+    return match.group(1)
+
+
+def load_q_policy(model_path: str) -> NumpyQPolicy:
+    """Read the online Q-network of an SB3 DQN zip into a ``NumpyQPolicy``."""
+    try:
+        archive = zipfile.ZipFile(model_path)
+    except zipfile.BadZipFile:
+        raise UnsupportedPolicyError(f"{model_path} is not a zip file")
+    with archive:
+        names = archive.namelist()
+        if "data" not in names or "policy.pth" not in names:
+            raise UnsupportedPolicyError("Not a stable-baselines3 model zip")
+        data = json.loads(archive.read("data"))
+        policy_bytes = archive.read("policy.pth")
+
+    if data.get("policy_class", {}).get("__module__") != "stable_baselines3.dqn.policies":
+        raise UnsupportedPolicyError("Only DQN policies are supported")
+    obs_space = data.get("observation_space", {})
+    if "Box" not in obs_space.get(":type:", "") or len(obs_space.get("_shape", [])) != 1:
+        raise UnsupportedPolicyError("Only flat Box observation spaces are supported")
+    action_space = data.get("action_space", {})
+    if "Discrete" not in action_space.get(":type:", ""):
+        raise UnsupportedPolicyError("Only Discrete action spaces are supported")
+
+    policy_kwargs = data.get("policy_kwargs") or {}
+    activation = _activation_name(policy_kwargs)
+
+    state_dict = _load_state_dict(policy_bytes)
+    layers: dict[int, dict[str, np.ndarray]] = {}
+    for key, value in state_dict.items():
+        if key.startswith("q_net_target."):
+            continue
+        match = _LAYER_KEY.match(key)
+        if match is None:
+            raise UnsupportedPolicyError(f"Unexpected parameter in Q-network: {key}")
+        layers.setdefault(int(match.group(1)), {})[match.group(2)] = value
+
+    stack = []
+    for index in sorted(layers):
+        params = layers[index]
+        if "weight" not in params or "bias" not in params:
+            raise UnsupportedPolicyError(f"Layer {index} is missing weight or bias")
+        stack.append((params["weight"], params["bias"]))
+
+    policy = NumpyQPolicy(stack, activation=activation, action_start=int(action_space.get("start", 0)))
+    if policy.obs_dim != int(obs_space["_shape"][0]) or policy.n_actions != int(action_space.get("n", -1)):
+        raise UnsupportedPolicyError("Q-network shape does not match the saved spaces")
+    return policy
+
+
+def evaluate_q_policy(policy: NumpyQPolicy, make_env, n_episodes: int, n_envs: int = 1,
+                      envs: list | None = None) -> list[float]:
+    """
+    Run ``n_episodes`` greedy episodes and return the per-episode rewards.
+
+    ``n_envs`` environments (built by ``make_env()``) are stepped in lockstep so that
+    every step is one batched forward pass. Episodes are split across environments the
+    same way as ``stable_baselines3.common.evaluation.evaluate_policy``.
+
+    Pass already built ``envs`` to reuse them: they are reset, not rebuilt, and are
+    left open for the caller. ``make_env`` is not called in that case.
+    """
+    owned = envs is None
+    n_envs = max(1, min(n_envs if owned else len(envs), n_episodes))
+    envs = [make_env() for _ in range(n_envs)] if owned else envs[:n_envs]
+    targets = [(n_episodes + i) // n_envs for i in range(n_envs)]
+    counts = [0] * n_envs
+    totals = [0.0] * n_envs
+    episode_rewards: list[float] = []
+    try:
+        obs = np.stack([env.reset()[0] for env in envs])
+        while any(c < t for c, t in zip(counts, targets)):
+            actions = policy.predict(obs)
+            for i, env in enumerate(envs):
+                if counts[i] >= targets[i]:
+                    continue
+                next_obs, reward, terminated, truncated, _ = env.step(actions[i])
+                totals[i] += float(reward)
+                if terminated or truncated:
+                    episode_rewards.append(totals[i])
+                    counts[i] += 1
+                    totals[i] = 0.0
+                    next_obs, _ = env.reset()
+                obs[i] = next_obs
+    finally:
+        if owned:
+            for env in envs:
+                env.close()
+    return episode_rewards
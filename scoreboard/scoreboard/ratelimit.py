@@ -0,0 +1,66 @@
+import math
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucketLimiter:
+    """
+    In-memory token bucket per key (email, IP, ...).
+
+    Each key starts with ``capacity`` tokens; a request takes one token and tokens
+    refill continuously at ``refill_per_second``. State lives in this process only,
+    which is fine for the single-process scoreboard.
+    """
+
+    def __init__(self, capacity: int, refill_per_second: float,
+                 max_keys: int = 10_000, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: dict[str, tuple[float, float]] = {}  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def _tokens_now(self, key: str, now: float) -> float:
+        tokens, updated_at = self._buckets.get(key, (float(self.capacity), now))
+        return min(float(self.capacity), tokens + (now - updated_at) * self.refill_per_second)
+
+    def allow(self, key: str) -> tuple[bool, int]:
+        """Take a token for ``key``. Returns (allowed, retry_after_seconds)."""
+        with self._lock:
+            now = self._clock()
+            tokens = self._tokens_now(key, now)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                if len(self._buckets) > self.max_keys:
+                    self._prune(now)
+                return True, 0
+            self._buckets[key] = (tokens, now)
+            retry_after = math.ceil((1 - tokens) / self.refill_per_second) if self.refill_per_second > 0 else 0
+            return False, retry_after
+
+    def _prune(self, now: float):
+        """Forget keys whose bucket has refilled completely — they behave like new keys."""
+        full = [k for k in self._buckets if self._tokens_now(k, now) >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+def client_ip(peer: str | None, headers, trusted_proxies: frozenset[str]) -> str:
+    """
+    Address to rate-limit a request by.
+
+    Behind the Cloudflare tunnel every connection comes from cloudflared and the real
+    client address is in CF-Connecting-IP. The header is only honoured when the peer
+    is a trusted proxy; anyone else could set it to a fresh value on every request.
+    """
+    if peer in trusted_proxies:
+        forwarded = headers.get("cf-connecting-ip")
+        if forwarded:
+            return forwarded.strip()
+    return peer or "unknown"
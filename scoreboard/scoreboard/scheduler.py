@@ -0,0 +1,110 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable
+
+from scoreboard.stats import percentile
+
+
+class Job:
+    """An evaluation job for one submission. ``created_at`` is the ISO timestamp stored in the DB."""
+
+    def __init__(self, sub_id: int, email: str, subgroup: str, created_at: str,
+                 is_reattempt: bool = False):
+        self.sub_id = sub_id
+        self.email = email
+        self.subgroup = subgroup
+        self.created_at = created_at
+        self.is_reattempt = is_reattempt
+        self.enqueued_at: float = 0.0
+
+
+class FairScheduler:
+    """
+    Priority queue of evaluation jobs, fair across students.
+
+    Jobs are ordered by
+      1. how many evaluations the student already received (fewer first),
+      2. first attempts before re-attempts,
+      3. submission age (older ``created_at`` first — this also places work
+         re-queued at startup ahead of fresh uploads from the same class),
+    so a student who re-uploads whenever the cooldown expires cannot starve others.
+    A student has at most one queued job: a newer submission replaces the older
+    one before it is ever dequeued.
+
+    Thread-safe; ``get`` blocks like ``queue.Queue.get``.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, wait_window: int = 1000):
+        self._clock = clock
+        self._heap: list[tuple[tuple, int, Job]] = []
+        self._queued: dict[str, Job] = {}  # email -> its only live queued job
+        self._served: dict[str, int] = defaultdict(int)
+        self._waits: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=wait_window))
+        self._seq = itertools.count()
+        self._unfinished = 0
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, job: Job) -> Job | None:
+        """Queue ``job``. Returns the superseded job of the same student, if one was dropped."""
+        with self._cond:
+            superseded = self._queued.get(job.email)
+            if superseded is not None:
+                # Left in the heap, skipped on get (lazy deletion)
+                self.dropped += 1
+                self._unfinished -= 1
+            job.enqueued_at = self._clock()
+            self._queued[job.email] = job
+            key = (self._served[job.email], job.is_reattempt, job.created_at, job.sub_id)
+            heapq.heappush(self._heap, (key, next(self._seq), job))
+            self._unfinished += 1
+            self._cond.notify()
+            return superseded
+
+    def get(self, timeout: float | None = None) -> Job:
+        """Remove and return the highest-priority job, blocking until one is available."""
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, _, job = heapq.heappop(self._heap)
+                    if self._queued.get(job.email) is not job:
+                        continue  # superseded
+                    del self._queued[job.email]
+                    self._served[job.email] += 1
+                    self._waits[job.subgroup].append(self._clock() - job.enqueued_at)
+                    return job
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No job available")
+
+    def task_done(self):
+        with self._cond:
+            self._unfinished -= 1
+            self._cond.notify_all()
+
+    def join(self):
+        """Block until every queued job has been taken and marked done."""
+        with self._cond:
+            while self._unfinished > 0:
+                self._cond.wait()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return len(self._queued)
+
+    def wait_stats(self) -> dict[str, dict]:
+        """Queue wait-time percentiles (seconds) per subgroup over the recent window."""
+        with self._cond:
+            waits = {subgroup: list(values) for subgroup, values in self._waits.items()}
+        return {
+            subgroup: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+            for subgroup, values in sorted(waits.items())
+            if values
+        }
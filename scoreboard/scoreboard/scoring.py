@@ -1,6 +1,11 @@
+# Edit these weights to change how students are ranked.
+# Both compute_rank_score and the SQL used by /api/scoreboard are built from them.
+STANDARD_WEIGHT = 0.7
+INDIVIDUAL_WEIGHT = 0.3
+
+
 def compute_rank_score(submission: dict) -> float:
     """
-    Edit this formula to change how students are ranked.
     Called with a submission dict containing at minimum:
       - standard_mean: float | None
       - individual_mean: float | None
@@ -8,4 +13,12 @@ def compute_rank_score(submission: dict) -> float:
     """
     standard = submission["standard_mean"] or 0
     individual = submission["individual_mean"] or 0
-    return standard * 0.7 + individual * 0.3
+    return standard * STANDARD_WEIGHT + individual * INDIVIDUAL_WEIGHT
+
+
+def rank_score_sql() -> str:
+    """The compute_rank_score formula as a SQL expression over the submissions columns."""
+    return (
+        f"(COALESCE(standard_mean, 0) * {float(STANDARD_WEIGHT)!r}::double precision"
+        f" + COALESCE(individual_mean, 0) * {float(INDIVIDUAL_WEIGHT)!r}::double precision)"
+    )
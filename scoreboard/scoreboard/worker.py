@@ -0,0 +1,145 @@
+"""
+Evaluation code that runs inside evaluator worker processes.
+
+Everything heavy (gymnasium, NumPy, stable-baselines3/torch, imageio) is imported
+inside the functions, so importing this module from the API process is cheap —
+the process pool only needs it importable to pickle a reference to
+``evaluate_submission``.
+
+Worker processes are long-lived: ``warm_up`` runs once per process as the pool
+initializer, and built environments are kept between jobs and reset instead of
+being constructed again.
+"""
+
+import logging
+from collections import OrderedDict
+from pathlib import Path
+
+from scoreboard import config
+
+logger = logging.getLogger(__name__)
+
+# Built LunarLander environments of this process, keyed by render mode and
+# gym.make kwargs, least recently used first.
+_env_cache: OrderedDict[tuple, list] = OrderedDict()
+
+
+def _get_envs(env_kwargs: dict, n: int, render_mode: str | None = None) -> list:
+    """Return ``n`` cached environments for ``env_kwargs``, building the missing ones.
+
+    The caller resets them and must not close them.
+    """
+    import gymnasium as gym
+
+    key = (render_mode, tuple(sorted(env_kwargs.items())))
+    envs = _env_cache.pop(key, [])
+    while len(envs) < n:
+        envs.append(gym.make("LunarLander-v3", render_mode=render_mode, **env_kwargs))
+    _env_cache[key] = envs
+    while len(_env_cache) > max(1, config.EVALUATION_ENV_CACHE_SIZE):
+        _, evicted = _env_cache.popitem(last=False)
+        for env in evicted:
+            env.close()
+    return envs[:n]
+
+
+def warm_up(param_sets: list[dict]):
+    """Process pool initializer: import the evaluation stack and build environments up front."""
+    try:
+        import numpy  # noqa: F401
+
+        from scoreboard import policy  # noqa: F401
+
+        for env_kwargs in param_sets:
+            _get_envs(env_kwargs, config.EVALUATION_ENVS)
+    except Exception:
+        # Jobs will report the real error; a failing initializer would break the whole pool
+        logger.exception("Evaluator worker warm-up failed")
+
+
+def _load_policy(model_path: str):
+    """Load the greedy policy for a model zip.
+
+    Uses the NumPy Q-network when the zip has the default MlpPolicy layout and falls
+    back to ``DQN.load`` for anything the NumPy path does not understand.
+    """
+    from scoreboard.policy import UnsupportedPolicyError, load_q_policy
+
+    try:
+        return load_q_policy(model_path)
+    except UnsupportedPolicyError as e:
+        logger.info(f"NumPy policy unavailable for {model_path} ({e}), falling back to SB3")
+    from stable_baselines3 import DQN
+    return DQN.load(model_path)
+
+
+def ready() -> bool:
+    """No-op job; submitting it makes the pool start (and warm up) a worker process."""
+    return True
+
+
+def _evaluate_model(model_path: str, env_kwargs: dict, n_episodes: int) -> dict:
+    """Evaluate a single model on LunarLander-v3 with the given env parameters.
+
+    Returns mean and std of the episode rewards plus the per-episode 'rewards' list.
+    """
+    import numpy as np
+
+    from scoreboard.policy import NumpyQPolicy, evaluate_q_policy
+
+    policy = _load_policy(model_path)
+    if isinstance(policy, NumpyQPolicy):
+        n_envs = max(1, min(config.EVALUATION_ENVS, n_episodes))
+        rewards = evaluate_q_policy(policy, None, n_episodes, envs=_get_envs(env_kwargs, n_envs))
+    else:
+        from stable_baselines3.common.evaluation import evaluate_policy
+
+        env = _get_envs(env_kwargs, 1)[0]
+        rewards, _ = evaluate_policy(policy, env, n_eval_episodes=n_episodes, return_episode_rewards=True)
+    rewards = [float(r) for r in rewards]
+    return {"mean_reward": float(np.mean(rewards)), "std_reward": float(np.std(rewards)), "rewards": rewards}
+
+
+def _record_video(model_path: str, env_kwargs: dict, output_path: str, seed: int = 42) -> None:
+    """Record one deterministic episode as MP4. Requires imageio[ffmpeg]."""
+    import imageio
+
+    from scoreboard.policy import NumpyQPolicy
+
+    policy = _load_policy(model_path)
+    env = _get_envs(env_kwargs, 1, render_mode="rgb_array")[0]
+    frames = []
+    obs, _ = env.reset(seed=seed)
+    terminated, truncated = False, False
+    max_frames = 1500
+    while not (terminated or truncated) and len(frames) < max_frames:
+        frames.append(env.render())
+        if isinstance(policy, NumpyQPolicy):
+            action = policy.predict(obs)
+        else:
+            action, _ = policy.predict(obs, deterministic=True)
+        obs, _, terminated, truncated, _ = env.step(action)
+    frames.append(env.render())
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    imageio.mimsave(output_path, frames, fps=30, macro_block_size=1)
+
+
+def evaluate_submission(model_standard_path: str, model_individual_path: str,
+                        individual_params: dict, n_episodes: int, video_path: str) -> dict:
+    """
+    Evaluate both models of a submission and record the demo video.
+
+    Returns a picklable dict with 'standard' and 'individual' results and
+    'video_error' (None when the video was recorded). Evaluation errors propagate;
+    video errors are reported but not raised, recording is best-effort.
+    """
+    std_result = _evaluate_model(model_standard_path, {}, n_episodes)
+    ind_result = _evaluate_model(model_individual_path, individual_params, n_episodes)
+
+    video_error = None
+    try:
+        _record_video(model_individual_path, individual_params, video_path)
+    except Exception as e:
+        video_error = f"{type(e).__name__}: {e}"
+
+    return {"standard": std_result, "individual": ind_result, "video_error": video_error}
@@ -2,6 +2,7 @@ const API = "";
 
 let subgroups = [];
 let submissions = [];
+let subgroupSubmissions = [];
 let activeTab = null;
 
 const $ = (id) => document.getElementById(id);
@@ -127,6 +128,7 @@ async function loadScoreboard() {
         const data = await resp.json();
         subgroups = data.subgroups;
         submissions = data.submissions;
+        subgroupSubmissions = data.subgroup_submissions;
         populateSubgroupDropdown();
         renderTabs();
         renderTable();
@@ -148,7 +150,7 @@ function populateSubgroupDropdown() {
 
 function renderTabs() {
     const allGroups = new Set([...subgroups]);
-    submissions.forEach((s) => allGroups.add(s.subgroup));
+    subgroupSubmissions.forEach((s) => allGroups.add(s.subgroup));
 
     const tabsEl = $("scoreboard-tabs");
     tabsEl.innerHTML = "";
@@ -170,36 +172,13 @@ function renderTabs() {
 }
 
 function renderTable() {
-    const filtered = activeTab
-        ? submissions.filter((s) => s.subgroup === activeTab)
+    // The server already returns one row per student (best submission, attempt
+    // number and total attempts) sorted by rank_score, and for the subgroup tabs
+    // one row per student and subgroup ranked within that subgroup.
+    const sorted = activeTab
+        ? subgroupSubmissions.filter((s) => s.subgroup === activeTab)
         : submissions;
 
-    // Group all submissions by email
-    const byEmail = new Map();
-    filtered.forEach((s) => {
-        if (!byEmail.has(s.email)) byEmail.set(s.email, []);
-        byEmail.get(s.email).push(s);
-    });
-
-    // For each student pick the best submission to display
-    const displayRows = [];
-    byEmail.forEach((group) => {
-        // Sort chronologically ascending to determine attempt order
-        const chronological = [...group].sort((a, b) => a.created_at.localeCompare(b.created_at));
-        const total = chronological.length;
-
-        // Best = highest rank_score among done submissions; fallback to most recent
-        const done = chronological.filter((s) => s.status === "done");
-        const best = done.length > 0
-            ? done.reduce((a, b) => (b.rank_score ?? -Infinity) > (a.rank_score ?? -Infinity) ? b : a)
-            : chronological[chronological.length - 1];
-
-        const attemptNumber = chronological.findIndex((s) => s.id === best.id) + 1;
-        displayRows.push({ ...best, _attempt_number: attemptNumber, _total_attempts: total });
-    });
-
-    const sorted = displayRows.sort((a, b) => (b.rank_score ?? -Infinity) - (a.rank_score ?? -Infinity));
-
     if (sorted.length === 0) {
         $("scoreboard-content").innerHTML = "<p>Немає результатів</p>";
         return;
@@ -227,8 +206,8 @@ function renderTable() {
         const statusBadge = `<span class="badge badge-${s.status}">${statusLabel(s.status)}</span>`;
         const dist = s.hyperparam_min_dist != null ? s.hyperparam_min_dist.toFixed(3) : "—";
 
-        const attemptLabel = s._total_attempts > 1
-            ? `#${s._attempt_number} з ${s._total_attempts} · ${formatDateTime(s.created_at)}`
+        const attemptLabel = s.total_attempts > 1
+            ? `#${s.attempt_number} з ${s.total_attempts} · ${formatDateTime(s.created_at)}`
             : formatDateTime(s.created_at);
 
         const videoCell = s.has_video
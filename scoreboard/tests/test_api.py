@@ -11,8 +11,8 @@ if not TEST_DATABASE_URL:
 os.environ["DATABASE_URL"] = TEST_DATABASE_URL
 
 from fastapi.testclient import TestClient
-from scoreboard import db
-from main import app
+from scoreboard import config, db
+from main import app, pin_email_limiter, pin_ip_limiter
 
 client = TestClient(app)
 
@@ -20,12 +20,14 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def fresh_db():
     db.init_db(db_url=TEST_DATABASE_URL)
+    pin_email_limiter.reset()
+    pin_ip_limiter.reset()
     yield
     conn = db.get_conn()
     with conn.cursor() as cur:
         cur.execute("DROP TABLE IF EXISTS submissions, pins, config")
     conn.commit()
-    db._conn = None
+    db.close_conn()
 
 
 def _get_pin(monkeypatch, email="student@lpnu.ua"):
@@ -90,3 +92,50 @@ class TestVideoEndpoint:
         data = resp.json()
         submission = next(s for s in data["submissions"] if s["id"] == sub_id)
         assert submission["has_video"] is False
+
+
+class TestDistributionEndpoint:
+    def test_distribution_not_found_before_evaluation(self, monkeypatch):
+        sub_id = _make_upload(monkeypatch).json()["submission_id"]
+        assert client.get(f"/api/distribution/{sub_id}").status_code == 404
+
+    def test_distribution_after_evaluation(self, monkeypatch):
+        sub_id = _make_upload(monkeypatch).json()["submission_id"]
+        db.update_evaluation(sub_id, standard_mean=2.0, standard_std=1.0, individual_mean=-1.0, individual_std=0.5,
+                             standard_rewards=[1.0, 2.0, 3.0], individual_rewards=[-1.5, -0.5])
+        data = client.get(f"/api/distribution/{sub_id}").json()
+        assert data["standard"]["rewards"] == [1.0, 2.0, 3.0]
+        assert data["individual"]["summary"]["p50"] == -1.0
+
+        summary_only = client.get(f"/api/distribution/{sub_id}", params={"rewards": "false"}).json()
+        assert "rewards" not in summary_only["standard"]
+        assert summary_only["standard"]["summary"]["count"] == 3
+
+
+class TestRateLimits:
+    def test_request_pin_rate_limited_per_email(self, monkeypatch):
+        monkeypatch.setattr("scoreboard.email_service.send_pin_email", lambda to, pin: None)
+        statuses = [
+            client.post("/api/request-pin", json={"email": "spam@lpnu.ua"}).status_code
+            for _ in range(config.PIN_REQUESTS_PER_EMAIL_BURST + 1)
+        ]
+        assert statuses[:-1] == [200] * config.PIN_REQUESTS_PER_EMAIL_BURST
+        assert statuses[-1] == 429
+
+    def test_request_pin_spoofed_forwarded_ip_is_ignored(self, monkeypatch):
+        monkeypatch.setattr("scoreboard.email_service.send_pin_email", lambda to, pin: None)
+        statuses = [
+            client.post(
+                "/api/request-pin",
+                json={"email": f"spoof{i}@lpnu.ua"},
+                headers={"CF-Connecting-IP": f"203.0.113.{i}"},
+            ).status_code
+            for i in range(config.PIN_REQUESTS_PER_IP_BURST + 1)
+        ]
+        assert statuses[-1] == 429
+
+    def test_request_pin_after_upload_hits_cooldown(self, monkeypatch):
+        resp = _make_upload(monkeypatch)
+        assert resp.status_code == 200
+        pin_resp = client.post("/api/request-pin", json={"email": "student@lpnu.ua"})
+        assert pin_resp.status_code == 429
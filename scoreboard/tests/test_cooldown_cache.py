@@ -0,0 +1,21 @@
+from scoreboard import config, db
+
+
+def test_cooldown_cache_drops_expired_entries(monkeypatch):
+    monkeypatch.setattr(config, "COOLDOWN_CACHE_MAX_KEYS", 3)
+    monkeypatch.setattr(db, "_cooldown_cache", {})
+    now = [1000.0]
+    monkeypatch.setattr(db.time, "monotonic", lambda: now[0])
+    for i in range(3):
+        db._cache_cooldown(f"fake{i}@lpnu.ua", None)
+    now[0] += config.COOLDOWN_CACHE_SECONDS
+    db._cache_cooldown("fresh@lpnu.ua", None)
+    assert list(db._cooldown_cache) == ["fresh@lpnu.ua"]
+
+
+def test_cooldown_cache_is_capped(monkeypatch):
+    monkeypatch.setattr(config, "COOLDOWN_CACHE_MAX_KEYS", 3)
+    monkeypatch.setattr(db, "_cooldown_cache", {})
+    for i in range(10):
+        db._cache_cooldown(f"fake{i}@lpnu.ua", None)
+    assert list(db._cooldown_cache) == ["fake7@lpnu.ua", "fake8@lpnu.ua", "fake9@lpnu.ua"]
@@ -1,4 +1,5 @@
 import os
+import threading
 from datetime import datetime, timedelta, timezone
 
 import pytest
@@ -11,6 +12,7 @@ if not TEST_DATABASE_URL:
 os.environ["DATABASE_URL"] = TEST_DATABASE_URL
 
 from scoreboard import db
+from scoreboard.scoring import compute_rank_score
 
 
 @pytest.fixture(autouse=True)
@@ -21,7 +23,29 @@ def fresh_db():
     with conn.cursor() as cur:
         cur.execute("DROP TABLE IF EXISTS submissions, pins, config")
     conn.commit()
-    db._conn = None
+    db.close_conn()
+
+
+class TestConnections:
+    def test_each_thread_has_its_own_connection(self):
+        sub_id = _submit("a@lpnu.ua")
+        main_conn = db.get_conn()
+        with main_conn.cursor() as cur:
+            cur.execute("UPDATE submissions SET status = 'evaluating' WHERE id = %s", (sub_id,))
+
+        other = []
+
+        def rollback_elsewhere():
+            other.append(db.get_conn())
+            other[0].rollback()
+            db.close_conn()
+
+        thread = threading.Thread(target=rollback_elsewhere)
+        thread.start()
+        thread.join()
+        assert other[0] is not main_conn
+        main_conn.commit()
+        assert db.get_submission(sub_id)["status"] == "evaluating"
 
 
 class TestPins:
@@ -91,6 +115,19 @@ class TestSubmissions:
         assert sub["status"] == "done"
         assert sub["standard_mean"] == 210.5
 
+    def test_update_evaluation_stores_reward_distribution(self):
+        sub_id = _submit("s@lpnu.ua")
+        assert db.get_reward_distribution(sub_id) is None
+        standard = [120.5, -30.25, 250.0]
+        db.update_evaluation(sub_id, standard_mean=113.4, standard_std=114.6,
+                             individual_mean=0.0, individual_std=0.0,
+                             standard_rewards=standard, individual_rewards=[0.0])
+        distribution = db.get_reward_distribution(sub_id)
+        assert distribution["standard"]["rewards"] == standard
+        assert distribution["standard"]["summary"]["p50"] == 120.5
+        assert distribution["individual"]["summary"]["count"] == 1
+        assert "standard_rewards" not in db.get_scoreboard()[0]
+
     def test_update_evaluation_error(self):
         sub_id = db.create_submission(
             email="s@lpnu.ua", name="О", surname="Б",
@@ -142,3 +179,68 @@ class TestVideoPath:
         )
         sub = db.get_submission(sub_id)
         assert sub.get("video_path") is None
+
+
+def _submit(email, subgroup="ПЗ-33-1"):
+    return db.create_submission(
+        email=email, name="О", surname="Б", subgroup=subgroup,
+        param_a=5, hyperparameters="{}", model_standard_path="/a", model_individual_path="/b",
+    )
+
+
+class TestScoreboard:
+    def test_best_submission_per_student_with_attempts(self):
+        first = _submit("a@lpnu.ua")
+        second = _submit("a@lpnu.ua")
+        third = _submit("a@lpnu.ua")
+        db.update_evaluation(first, standard_mean=100.0, standard_std=1.0, individual_mean=50.0, individual_std=1.0)
+        db.update_evaluation(second, standard_mean=250.0, standard_std=1.0, individual_mean=200.0, individual_std=1.0)
+        db.update_evaluation_error(third, "boom")
+
+        rows = db.get_scoreboard()
+        assert len(rows) == 1
+        best = rows[0]
+        assert best["id"] == second
+        assert best["attempt_number"] == 2
+        assert best["total_attempts"] == 3
+
+    def test_best_submission_per_subgroup(self):
+        old_group = _submit("a@lpnu.ua", subgroup="ПЗ-33-1")
+        new_group = _submit("a@lpnu.ua", subgroup="ПЗ-34-1")
+        db.update_evaluation(old_group, standard_mean=250.0, standard_std=1.0, individual_mean=200.0, individual_std=1.0)
+        db.update_evaluation(new_group, standard_mean=100.0, standard_std=1.0, individual_mean=50.0, individual_std=1.0)
+
+        assert [r["id"] for r in db.get_scoreboard()] == [old_group]
+        rows = {r["subgroup"]: r for r in db.get_scoreboard(by_subgroup=True)}
+        assert rows["ПЗ-34-1"]["id"] == new_group
+        assert rows["ПЗ-34-1"]["total_attempts"] == 1
+        assert rows["ПЗ-33-1"]["id"] == old_group
+
+    def test_most_recent_when_nothing_evaluated(self):
+        _submit("b@lpnu.ua")
+        latest = _submit("b@lpnu.ua")
+        rows = db.get_scoreboard()
+        assert rows[0]["id"] == latest
+        assert rows[0]["attempt_number"] == 2
+
+    def test_rank_score_matches_python_formula_and_orders_rows(self):
+        scores = {"a@lpnu.ua": (100.0, -20.0), "b@lpnu.ua": (210.5, 180.25), "c@lpnu.ua": (-50.0, -100.0)}
+        for email, (std, ind) in scores.items():
+            sub_id = _submit(email)
+            db.update_evaluation(sub_id, standard_mean=std, standard_std=1.0, individual_mean=ind, individual_std=1.0)
+        pending = _submit("d@lpnu.ua")
+
+        rows = db.get_scoreboard()
+        assert [r["email"] for r in rows] == ["b@lpnu.ua", "a@lpnu.ua", "d@lpnu.ua", "c@lpnu.ua"]
+        for row in rows:
+            assert row["rank_score"] == pytest.approx(compute_rank_score(row))
+        assert next(r for r in rows if r["id"] == pending)["rank_score"] == 0.0
+        assert all(r["has_video"] is False for r in rows)
+
+
+def test_count_earlier_submissions():
+    first = _submit("a@lpnu.ua")
+    _submit("b@lpnu.ua")
+    second = _submit("a@lpnu.ua")
+    assert db.count_earlier_submissions("a@lpnu.ua", first) == 0
+    assert db.count_earlier_submissions("a@lpnu.ua", second) == 1
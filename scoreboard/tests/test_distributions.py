@@ -0,0 +1,28 @@
+import math
+
+import pytest
+
+from scoreboard.distributions import decode_rewards, encode_rewards, summarize_rewards
+
+
+def test_round_trip_is_float32():
+    rewards = [1.5, -250.25, 0.1]
+    blob = encode_rewards(rewards)
+    assert len(blob) == 12
+    decoded = decode_rewards(memoryview(blob))
+    assert decoded[:2] == [1.5, -250.25]
+    assert decoded[2] == pytest.approx(0.1, rel=1e-6)
+
+
+def test_decode_rejects_truncated_blob():
+    with pytest.raises(ValueError):
+        decode_rewards(encode_rewards([1.0])[:3])
+
+
+def test_summary():
+    summary = summarize_rewards([1.0, 2.0, 3.0, 4.0, 5.0])
+    assert summary["count"] == 5
+    assert summary["mean"] == 3.0
+    assert math.isclose(summary["std"], math.sqrt(2))
+    assert (summary["min"], summary["p50"], summary["max"]) == (1.0, 3.0, 5.0)
+    assert summarize_rewards([]) == {"count": 0}
@@ -0,0 +1,149 @@
+import time
+
+import pytest
+
+from scoreboard import config, email_service
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_RETRY_BASE_SECONDS", 0.0)
+    monkeypatch.setattr(config, "EMAIL_BATCH_WINDOW_SECONDS", 0.0)
+    backend = email_service.LocalSinkBackend()
+    email_service.set_backend(backend)
+    yield backend
+    email_service.stop()
+    email_service.set_backend(None)
+
+
+class FlakyBackend(email_service.LocalSinkBackend):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+        self.calls = 0
+
+    def send_batch(self, messages):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("provider unavailable")
+        super().send_batch(messages)
+
+
+class RejectingBackend(email_service.LocalSinkBackend):
+    """Rejects any batch containing an address with 'bad' in it, like a provider validating the whole batch."""
+
+    def send_batch(self, messages):
+        if any("bad" in message["to"][0] for message in messages):
+            raise ValueError("invalid `to` field")
+        super().send_batch(messages)
+
+
+class DownForBackend(email_service.LocalSinkBackend):
+    """Provider unreachable for one recipient only."""
+
+    def __init__(self, unreachable):
+        super().__init__()
+        self.unreachable = unreachable
+        self.calls = 0
+
+    def send_batch(self, messages):
+        self.calls += 1
+        if any(message["to"] == [self.unreachable] for message in messages):
+            raise ConnectionError("provider unavailable")
+        super().send_batch(messages)
+
+
+def test_send_pin_email_is_queued_not_sent(sink):
+    email_service.send_pin_email("student@lpnu.ua", "123456")
+    assert sink.sent == []
+    email_service.start()
+    email_service.flush()
+    assert len(sink.sent) == 1
+    assert sink.sent[0]["to"] == ["student@lpnu.ua"]
+    assert "123456" in sink.sent[0]["text"]
+
+
+def test_queued_messages_are_batched(sink):
+    for i in range(5):
+        email_service.send_pin_email(f"s{i}@lpnu.ua", "000000")
+    email_service.start()
+    email_service.flush()
+    assert sink.batches == [5]
+
+
+def test_retry_until_success(sink):
+    backend = FlakyBackend(failures=2)
+    email_service.set_backend(backend)
+    email_service.send_pin_email("student@lpnu.ua", "123456")
+    email_service.start()
+    email_service.flush()
+    assert backend.calls == 3
+    assert len(backend.sent) == 1
+
+
+def test_gives_up_after_max_attempts(sink, monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_MAX_ATTEMPTS", 2)
+    backend = FlakyBackend(failures=10)
+    email_service.set_backend(backend)
+    email_service.send_pin_email("student@lpnu.ua", "123456")
+    email_service.start()
+    email_service.flush()
+    assert backend.calls == 2
+    assert backend.sent == []
+
+
+def test_rejected_batch_falls_back_to_single_sends(sink):
+    backend = RejectingBackend()
+    email_service.set_backend(backend)
+    for to in ["a@lpnu.ua", "bad@lpnu.ua", "b@lpnu.ua"]:
+        email_service.send_pin_email(to, "123456")
+    email_service.start()
+    email_service.flush()
+    assert [message["to"] for message in backend.sent] == [["a@lpnu.ua"], ["b@lpnu.ua"]]
+
+
+def test_retry_does_not_block_later_messages(sink, monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_RETRY_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(config, "EMAIL_MAX_ATTEMPTS", 2)
+    backend = DownForBackend("down@lpnu.ua")
+    email_service.set_backend(backend)
+    email_service.send_pin_email("down@lpnu.ua", "123456")
+    email_service.start()
+    while backend.calls == 0:
+        time.sleep(0.01)
+    email_service.send_pin_email("student@lpnu.ua", "654321")
+    deadline = time.monotonic() + 0.4
+    while not backend.sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [message["to"] for message in backend.sent] == [["student@lpnu.ua"]]
+    email_service.flush()
+    assert backend.calls == 3
+
+
+def test_stop_timeout_keeps_a_single_sender(sink, monkeypatch):
+    monkeypatch.setattr(config, "EMAIL_RETRY_BASE_SECONDS", 1.0)
+    monkeypatch.setattr(config, "EMAIL_MAX_ATTEMPTS", 2)
+    backend = DownForBackend("down@lpnu.ua")
+    email_service.set_backend(backend)
+    email_service.send_pin_email("down@lpnu.ua", "123456")
+    email_service.start()
+    while backend.calls == 0:
+        time.sleep(0.01)
+    sender = email_service._thread
+    email_service.stop(timeout=0.05)
+    assert email_service._thread is sender and sender.is_alive()
+
+    email_service.start()
+    assert email_service._thread is sender
+    email_service.send_pin_email("student@lpnu.ua", "654321")
+    email_service.flush()
+    assert [message["to"] for message in backend.sent] == [["student@lpnu.ua"]]
+    assert sender.is_alive()  # resumed instead of exiting after its retries
+
+
+def test_local_sink_writes_files(tmp_path):
+    backend = email_service.LocalSinkBackend(tmp_path)
+    backend.send_batch([{"to": ["a@lpnu.ua"], "text": "Код"}])
+    files = list(tmp_path.glob("*.json"))
+    assert len(files) == 1
+    assert "Код" in files[0].read_text(encoding="utf-8")
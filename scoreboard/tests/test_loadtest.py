@@ -0,0 +1,29 @@
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.loadtest import ENDPOINTS, compare, run
+
+
+def _report(p95, rps, errors=0):
+    return {"endpoints": {"scoreboard": {"p95_ms": p95, "throughput_rps": rps, "errors": errors}}}
+
+
+def test_compare_within_threshold():
+    assert compare(_report(11.0, 95.0), _report(10.0, 100.0), threshold=0.2) == []
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    regressions = compare(_report(15.0, 50.0, errors=1), _report(10.0, 100.0), threshold=0.2)
+    assert len(regressions) == 3
+
+
+@pytest.mark.skipif(not os.environ.get("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_small_load_run():
+    report = asyncio.run(run(os.environ["TEST_DATABASE_URL"], students=5, concurrency=3,
+                             scoreboard_requests=5, model_kb=4, seed=0))
+    assert list(report["endpoints"]) == ENDPOINTS
+    for stats in report["endpoints"].values():
+        assert stats["errors"] == 0
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
@@ -0,0 +1,104 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from scoreboard.policy import NumpyQPolicy, UnsupportedPolicyError, evaluate_q_policy, load_q_policy
+
+
+def _random_layers(rng, sizes):
+    return [
+        (rng.standard_normal((n_out, n_in)).astype(np.float32), rng.standard_normal(n_out).astype(np.float32))
+        for n_in, n_out in zip(sizes[:-1], sizes[1:])
+    ]
+
+
+def test_forward_matches_manual_mlp():
+    rng = np.random.default_rng(0)
+    layers = _random_layers(rng, [8, 16, 16, 4])
+    policy = NumpyQPolicy(layers)
+    obs = rng.standard_normal((32, 8)).astype(np.float32)
+
+    x = obs
+    for i, (w, b) in enumerate(layers):
+        x = x @ w.T + b
+        if i < len(layers) - 1:
+            x = np.maximum(x, 0)
+
+    np.testing.assert_allclose(policy.q_values(obs), x, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(policy.predict(obs), x.argmax(axis=1))
+
+
+def test_single_observation_returns_scalar_action():
+    rng = np.random.default_rng(1)
+    policy = NumpyQPolicy(_random_layers(rng, [8, 4]), action_start=2)
+    action = policy.predict(rng.standard_normal(8))
+    assert action.shape == ()
+    assert 2 <= int(action) < 6
+
+
+def test_unknown_activation_rejected():
+    rng = np.random.default_rng(2)
+    with pytest.raises(UnsupportedPolicyError):
+        NumpyQPolicy(_random_layers(rng, [8, 4]), activation="GELU")
+
+
+def test_non_sb3_zip_rejected(tmp_path):
+    path = tmp_path / "model.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("readme.txt", "not a model")
+    with pytest.raises(UnsupportedPolicyError):
+        load_q_policy(str(path))
+
+
+class _CountdownEnv:
+    """Episode of fixed length with reward 1 per step."""
+
+    def __init__(self, length):
+        self.length = length
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return np.zeros(8, dtype=np.float32), {}
+
+    def step(self, action):
+        self.t += 1
+        return np.zeros(8, dtype=np.float32), 1.0, self.t >= self.length, False, {}
+
+    def close(self):
+        self.closed = True
+
+
+def test_evaluate_runs_requested_episode_count():
+    rng = np.random.default_rng(3)
+    policy = NumpyQPolicy(_random_layers(rng, [8, 4]))
+    rewards = evaluate_q_policy(policy, lambda: _CountdownEnv(5), n_episodes=7, n_envs=3)
+    assert rewards == [5.0] * 7
+
+
+def test_evaluate_reuses_given_envs_without_closing():
+    rng = np.random.default_rng(4)
+    policy = NumpyQPolicy(_random_layers(rng, [8, 4]))
+    envs = [_CountdownEnv(5), _CountdownEnv(5)]
+    for _ in range(2):
+        rewards = evaluate_q_policy(policy, None, n_episodes=4, envs=envs)
+        assert rewards == [5.0] * 4
+    assert not any(hasattr(env, "closed") for env in envs)
+
+
+def test_matches_sb3_predict(tmp_path):
+    gym = pytest.importorskip("gymnasium")
+    sb3 = pytest.importorskip("stable_baselines3")
+    torch = pytest.importorskip("torch")
+
+    env = gym.make("CartPole-v1")
+    for kwargs in [{}, {"net_arch": [32], "activation_fn": torch.nn.Tanh}]:
+        model = sb3.DQN("MlpPolicy", env, policy_kwargs=kwargs, seed=0)
+        path = tmp_path / "model.zip"
+        model.save(path)
+
+        policy = load_q_policy(str(path))
+        obs = np.stack([env.observation_space.sample() for _ in range(512)])
+        expected, _ = model.predict(obs, deterministic=True)
+        np.testing.assert_array_equal(policy.predict(obs), expected)
@@ -0,0 +1,57 @@
+from scoreboard.ratelimit import TokenBucketLimiter, client_ip
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_reject():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=3, refill_per_second=1 / 60, clock=clock)
+    assert [limiter.allow("a@lpnu.ua")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.allow("a@lpnu.ua")
+    assert allowed is False
+    assert retry_after == 60
+
+
+def test_keys_are_independent():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1 / 60, clock=clock)
+    assert limiter.allow("a@lpnu.ua")[0] is True
+    assert limiter.allow("b@lpnu.ua")[0] is True
+    assert limiter.allow("a@lpnu.ua")[0] is False
+
+
+def test_refill_over_time():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1 / 60, clock=clock)
+    assert limiter.allow("a@lpnu.ua")[0] is True
+    clock.now += 30
+    assert limiter.allow("a@lpnu.ua") == (False, 30)
+    clock.now += 30
+    assert limiter.allow("a@lpnu.ua")[0] is True
+
+
+def test_prune_keeps_memory_bounded():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=1.0, max_keys=10, clock=clock)
+    for i in range(10):
+        limiter.allow(f"user{i}")
+    clock.now += 5
+    limiter.allow("fresh")
+    assert len(limiter._buckets) == 1
+
+
+def test_client_ip_ignores_spoofed_header_from_untrusted_peer():
+    headers = {"cf-connecting-ip": "203.0.113.7"}
+    assert client_ip("198.51.100.1", headers, frozenset({"127.0.0.1"})) == "198.51.100.1"
+
+
+def test_client_ip_uses_header_from_trusted_proxy():
+    headers = {"cf-connecting-ip": " 203.0.113.7 "}
+    assert client_ip("127.0.0.1", headers, frozenset({"127.0.0.1"})) == "203.0.113.7"
+    assert client_ip("127.0.0.1", {}, frozenset({"127.0.0.1"})) == "127.0.0.1"
@@ -0,0 +1,66 @@
+import pytest
+
+from scoreboard.scheduler import FairScheduler, Job
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _job(sub_id, email, created_at, subgroup="КН-1", is_reattempt=False):
+    return Job(sub_id, email, subgroup, f"2026-03-01T10:{created_at:02d}:00+00:00", is_reattempt=is_reattempt)
+
+
+def test_orders_by_age():
+    scheduler = FairScheduler()
+    scheduler.put(_job(2, "b@lpnu.ua", 5))
+    scheduler.put(_job(1, "a@lpnu.ua", 1))
+    assert [scheduler.get(0).sub_id, scheduler.get(0).sub_id] == [1, 2]
+
+
+def test_first_attempts_before_reattempts():
+    scheduler = FairScheduler()
+    scheduler.put(_job(1, "a@lpnu.ua", 1, is_reattempt=True))
+    scheduler.put(_job(2, "b@lpnu.ua", 5))
+    assert scheduler.get(0).sub_id == 2
+
+
+def test_superseded_job_is_dropped():
+    scheduler = FairScheduler()
+    scheduler.put(_job(1, "a@lpnu.ua", 1))
+    superseded = scheduler.put(_job(3, "a@lpnu.ua", 9, is_reattempt=True))
+    assert superseded.sub_id == 1
+    assert scheduler.qsize() == 1
+    assert scheduler.get(0).sub_id == 3
+    with pytest.raises(TimeoutError):
+        scheduler.get(0)
+    scheduler.task_done()
+    scheduler.join()  # the dropped job does not count as unfinished
+
+
+def test_frequent_uploader_does_not_starve_others():
+    scheduler = FairScheduler()
+    scheduler.put(_job(1, "a@lpnu.ua", 1))
+    assert scheduler.get(0).sub_id == 1
+    # a@ re-uploads with an older timestamp than b@'s first upload would allow FIFO to favour a@
+    scheduler.put(_job(3, "b@lpnu.ua", 8))
+    scheduler.put(_job(2, "a@lpnu.ua", 2))
+    assert scheduler.get(0).sub_id == 3
+
+
+def test_wait_stats_per_subgroup():
+    clock = FakeClock()
+    scheduler = FairScheduler(clock=clock)
+    scheduler.put(_job(1, "a@lpnu.ua", 1, subgroup="КН-1"))
+    scheduler.put(_job(2, "b@lpnu.ua", 2, subgroup="КН-2"))
+    clock.now += 10
+    scheduler.get(0)
+    clock.now += 20
+    scheduler.get(0)
+    stats = scheduler.wait_stats()
+    assert stats["КН-1"] == {"count": 1, "p50": 10.0, "p95": 10.0, "max": 10.0}
+    assert stats["КН-2"]["p50"] == 30.0
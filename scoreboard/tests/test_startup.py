@@ -0,0 +1,6 @@
+from benchmarks.bench_startup import measure
+
+
+def test_api_process_does_not_import_ml_stack():
+    results = measure(repeats=1)
+    assert results["heavy_modules"] == [], f"API process imported {results['heavy_modules']}"
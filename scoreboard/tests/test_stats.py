@@ -0,0 +1,15 @@
+import math
+
+from scoreboard.stats import percentile
+
+
+def test_percentile_interpolates():
+    values = [4.0, 1.0, 3.0, 2.0, 5.0]
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 5.0
+    assert math.isclose(percentile(values, 95), 4.8)
+
+
+def test_percentile_empty_is_nan():
+    assert math.isnan(percentile([], 50))
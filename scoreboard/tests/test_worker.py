@@ -0,0 +1,35 @@
+import pytest
+
+from scoreboard import config, worker
+
+pytest.importorskip("gymnasium")
+pytest.importorskip("Box2D")
+
+
+@pytest.fixture(autouse=True)
+def _clear_env_cache():
+    worker._env_cache.clear()
+    yield
+    worker._env_cache.clear()
+
+
+def test_envs_are_reused_per_params():
+    first = worker._get_envs({"gravity": -10.5}, 2)
+    again = worker._get_envs({"gravity": -10.5}, 2)
+    assert [id(e) for e in first] == [id(e) for e in again]
+    assert worker._get_envs({}, 1)[0] not in first
+
+
+def test_least_recently_used_params_are_evicted(monkeypatch):
+    monkeypatch.setattr(config, "EVALUATION_ENV_CACHE_SIZE", 2)
+    worker._get_envs({"gravity": -10.0}, 1)
+    worker._get_envs({"gravity": -10.5}, 1)
+    worker._get_envs({"gravity": -10.0}, 1)
+    worker._get_envs({"gravity": -11.0}, 1)
+    assert [dict(key[1]) for key in worker._env_cache] == [{"gravity": -10.0}, {"gravity": -11.0}]
+
+
+def test_warm_up_builds_envs(monkeypatch):
+    monkeypatch.setattr(config, "EVALUATION_ENVS", 3)
+    worker.warm_up([{}, {"enable_wind": True, "wind_power": 4.5}])
+    assert [len(envs) for envs in worker._env_cache.values()] == [3, 3]